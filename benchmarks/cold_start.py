@@ -0,0 +1,95 @@
+"""
+Arranque en frío medido como en Vercel: cada ronda lanza un intérprete nuevo, importa
+`main`, ejecuta el arranque de la app (lifespan) y atiende la primera petición a `/`.
+
+    python -m benchmarks.cold_start [--runs 10] [--budget 1500]
+    python -m benchmarks.cold_start --json cold_start.json
+
+Se sale con código 1 si el p95 del total supera el presupuesto (--budget o
+COLD_START_BUDGET_MS). Por defecto se simula Vercel (VERCEL=1) con la configuración
+de producción: sin comprobación de la base de datos al arrancar ni workers de webhooks.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "1500"))
+
+# Se ejecuta en el proceso hijo; escribe los tiempos en la última línea de stdout
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from starlette.testclient import TestClient
+with TestClient(main.app) as client:
+    status = client.get("/").status_code
+    served = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_request_ms": (served - imported) * 1000, "status": status}))
+'''
+
+def run_once(env: dict) -> dict:
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, env=env)
+    total_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ Cold start run failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return {**timings, "total_ms": total_ms}
+
+def p95(values: list[float]) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET_MS, help="p95 máximo del total, en ms")
+    parser.add_argument("--no-serverless", action="store_true", help="No define VERCEL=1 en el proceso hijo")
+    parser.add_argument("--json", help="Guarda los resultados en este fichero")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.no_serverless:
+        env["VERCEL"] = "1"
+
+    # Una ronda previa para que los .pyc existan: en Vercel se despliegan ya compilados
+    run_once(env)
+    runs = [run_once(env) for _ in range(args.runs)]
+
+    summary = {}
+    print(f"{'phase':<16} {'median (ms)':>12} {'p95 (ms)':>10}")
+    for phase in ("import_ms", "first_request_ms", "total_ms"):
+        values = [run[phase] for run in runs]
+        summary[phase] = {"median": statistics.median(values), "p95": p95(values)}
+        print(f"{phase[:-3]:<16} {summary[phase]['median']:>12.1f} {summary[phase]['p95']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "created_at": datetime.utcnow().isoformat(),
+                    "budget_ms": args.budget,
+                    "summary": summary,
+                    "runs": runs
+                },
+                f,
+                indent=2
+            )
+        print(f"\n✅ Results written to {args.json}")
+
+    if summary["total_ms"]["p95"] > args.budget:
+        print(f"\n❌ Cold start p95 {summary['total_ms']['p95']:.1f} ms is over the {args.budget:.0f} ms budget")
+        sys.exit(1)
+    print(f"\n✅ Cold start p95 {summary['total_ms']['p95']:.1f} ms is within the {args.budget:.0f} ms budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compara el parser de diffs compartido (services/github/diff.py) con la versión
+que estaba copiada en los handlers de push y pull_request.
+
+    python -m benchmarks.diff_parser [--lines 50000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+import tracemalloc
+from services.github.diff import parse_diff_to_lines, iter_diff_lines
+
+def legacy_parse_diff_to_lines(diff_text: str):
+    lines = diff_text.splitlines()
+    result = []
+
+    current_old = None
+    current_new = None
+
+    for line in lines:
+        header_match = re.match(r"@@ -(\d+),?\d* \+(\d+),?\d* @@", line)
+        if header_match:
+            current_old = int(header_match.group(1))
+            current_new = int(header_match.group(2))
+            continue
+
+        if line.startswith("-"):
+            result.append({"line": current_old, "type": "delete", "code": line[1:].strip()})
+            current_old += 1
+        elif line.startswith("+"):
+            result.append({"line": current_new, "type": "insert", "code": line[1:].strip()})
+            current_new += 1
+        elif line.startswith(" "):
+            result.append({"line": current_new, "type": "normal", "code": line[1:].strip()})
+            current_old += 1
+            current_new += 1
+
+    return result
+
+def make_patch(total_lines: int, hunk_size: int = 40, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    out = []
+    old = new = 1
+    written = 0
+    while written < total_lines:
+        out.append(f"@@ -{old},{hunk_size} +{new},{hunk_size} @@ def generated_{written}():")
+        for _ in range(hunk_size):
+            marker = rng.choice(" +-  ")
+            code = f"    value_{written} = compute(value_{written - 1}, {rng.random():.6f})  # generated"
+            out.append(marker + code)
+            if marker != "+":
+                old += 1
+            if marker != "-":
+                new += 1
+            written += 1
+        old += 10
+        new += 10
+    return "\n".join(out)
+
+def measure(fn, text: str, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    fn(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[1_000, 10_000, 50_000, 200_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    candidates = {
+        "legacy": legacy_parse_diff_to_lines,
+        "parse_diff_to_lines": parse_diff_to_lines,
+        # Consumir el generador sin guardar las líneas: el modo streaming
+        "iter_diff_lines": lambda text: sum(1 for _ in iter_diff_lines(text))
+    }
+
+    print(f"{'lines':>8}  {'implementation':<20} {'time (ms)':>10} {'peak (MiB)':>11}")
+    for total_lines in args.lines:
+        patch = make_patch(total_lines)
+        expected = legacy_parse_diff_to_lines(patch)
+        assert [l.to_dict() for l in parse_diff_to_lines(patch)] == expected
+
+        for name, fn in candidates.items():
+            result = measure(fn, patch, args.repeat)
+            print(
+                f"{total_lines:>8}  {name:<20} {result['seconds'] * 1000:>10.2f} "
+                f"{result['peak_bytes'] / (1024 * 1024):>11.2f}"
+            )
+
+if __name__ == "__main__":
+    main()
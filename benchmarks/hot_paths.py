@@ -0,0 +1,175 @@
+"""
+Microbenchmarks de las funciones puras del camino caliente (sin red ni base de datos):
+parser de diffs, prompts, limpieza de respuestas del LLM, árbol de archivos, fechas y
+agrupado de commits. Las entradas son sintéticas y deterministas.
+
+    python -m benchmarks.hot_paths [--sizes small medium large huge] [--repeat 5]
+    python -m benchmarks.hot_paths --json results.json
+    python -m benchmarks.hot_paths --compare results.json [--threshold 1.25]
+
+Con --compare se sale con código 1 si algún caso es más lento (o usa más memoria) que
+la línea base multiplicada por --threshold.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+from datetime import datetime, timedelta
+from benchmarks.diff_parser import make_patch, measure
+from services.github.diff import parse_diff_to_lines
+from services.github.events.push import generate_prompt, generate_summary_prompt, clean_llm_response
+from services.github.github_service import build_file_tree, group_commits, humanize_date, relative_day
+
+# Tamaño de cada entrada por nivel: líneas de diff, archivos de un PR, commits o fechas
+SIZES = {
+    "small": {"lines": 100, "files": 10, "commits": 30, "dates": 100},
+    "medium": {"lines": 5_000, "files": 500, "commits": 300, "dates": 5_000},
+    "large": {"lines": 50_000, "files": 2_000, "commits": 1_000, "dates": 50_000},
+    "huge": {"lines": 200_000, "files": 10_000, "commits": 5_000, "dates": 200_000}
+}
+
+def make_files(count: int, seed: int = 7) -> list[dict]:
+    # Archivos de un PR tal como los devuelve /pulls/{n}/files, repartidos en carpetas anidadas
+    rng = random.Random(seed)
+    files = []
+    for i in range(count):
+        depth = rng.randint(1, 5)
+        folders = [f"dir_{rng.randint(0, 20)}" for _ in range(depth)]
+        files.append({
+            "filename": "/".join(folders + [f"file_{i}.py"]),
+            "status": rng.choice(["added", "modified", "removed"]),
+            "additions": rng.randint(0, 200),
+            "deletions": rng.randint(0, 200),
+            "patch": "@@ -1,3 +1,3 @@\n-old\n+new\n context"
+        })
+    return files
+
+def make_feedback(files: int, comments_per_file: int = 5) -> list[dict]:
+    return [
+        {
+            "filePath": f"src/module_{i}/file_{i}.py",
+            "comments": [
+                {"type": "insert", "comment": f"⚠️ Consider extracting this block ({j}).", "lineNumber": j}
+                for j in range(comments_per_file)
+            ]
+        }
+        for i in range(files)
+    ]
+
+def make_llm_response(files: int) -> str:
+    return "Here is the review:\n```json\n" + json.dumps(make_feedback(files)[0]["comments"] * files, indent=2) + "\n```\n"
+
+def make_dates(count: int) -> list[str]:
+    start = datetime(2025, 1, 1)
+    return [(start + timedelta(minutes=37 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(count)]
+
+def make_commits(count: int) -> list[dict]:
+    # Elementos con la forma de GET /repos/{repo}/commits
+    return [
+        {
+            "sha": f"{i:040x}",
+            "author": {"login": "octocat"} if i % 3 else None,
+            "commit": {
+                "message": f"Commit number {i}",
+                "author": {"name": "The Octocat", "date": date},
+                "verification": {"verified": bool(i % 2)}
+            }
+        }
+        for i, date in enumerate(make_dates(count))
+    ]
+
+def build_cases(size: dict) -> list[tuple[str, object, object]]:
+    """
+    [(nombre, función, entrada)] para un nivel de tamaño. Las entradas se construyen
+    antes de medir, así que solo se mide la función.
+    """
+    patch = make_patch(size["lines"])
+    structured_lines = parse_diff_to_lines(patch)
+    commits = make_commits(size["commits"])
+    statuses = {commit["sha"]: "analyzed" for commit in commits[::2]}
+    dates = make_dates(size["dates"])
+    parsed_dates = [datetime.strptime(d, "%Y-%m-%dT%H:%M:%SZ") for d in dates]
+
+    return [
+        ("parse_diff_to_lines", parse_diff_to_lines, patch),
+        ("generate_prompt", generate_prompt, structured_lines),
+        (
+            "generate_summary_prompt",
+            lambda feedback: generate_summary_prompt("acme/api", "0" * 40, feedback, len(feedback)),
+            make_feedback(size["files"])
+        ),
+        ("clean_llm_response", clean_llm_response, make_llm_response(size["files"])),
+        ("build_file_tree", build_file_tree, make_files(size["files"])),
+        ("humanize_date", lambda values: [humanize_date(v) for v in values], dates),
+        ("relative_day", lambda values: [relative_day(v) for v in values], parsed_dates),
+        ("group_commits", lambda data: group_commits(data, "main", statuses), commits)
+    ]
+
+def run(sizes: list[str], repeat: int) -> list[dict]:
+    results = []
+    print(f"{'size':<8} {'case':<24} {'time (ms)':>10} {'peak (MiB)':>11}")
+    for size_name in sizes:
+        for name, fn, value in build_cases(SIZES[size_name]):
+            result = measure(fn, value, repeat)
+            results.append({"case": name, "size": size_name, **result})
+            print(
+                f"{size_name:<8} {name:<24} {result['seconds'] * 1000:>10.2f} "
+                f"{result['peak_bytes'] / (1024 * 1024):>11.2f}"
+            )
+    return results
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> list[str]:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["size"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n{'size':<8} {'case':<24} {'time x':>8} {'peak x':>8}")
+    for result in results:
+        base = baseline.get((result["case"], result["size"]))
+        if base is None:
+            continue
+        time_ratio = result["seconds"] / base["seconds"] if base["seconds"] else 1
+        peak_ratio = result["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1
+        flag = ""
+        if time_ratio > threshold or peak_ratio > threshold:
+            flag = " ❌"
+            regressions.append(f"{result['size']}/{result['case']}")
+        print(f"{result['size']:<8} {result['case']:<24} {time_ratio:>8.2f} {peak_ratio:>8.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium", "large"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Guarda los resultados en este fichero")
+    parser.add_argument("--compare", help="Compara con los resultados guardados en este fichero")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "created_at": datetime.utcnow().isoformat(),
+                    "repeat": args.repeat,
+                    "results": results
+                },
+                f,
+                indent=2
+            )
+        print(f"\n✅ Results written to {args.json}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions over x{args.threshold}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ No regressions over x{args.threshold}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Tiempo de serialización y bytes enviados para una respuesta de feedback de PR
+representativa (por defecto 500 archivos), en modo completo y `tree=light`.
+
+Al final la misma respuesta se pide a la app real (`main.app`, con todos sus
+middlewares) para comprobar que sale comprimida; si no, se sale con código 1.
+
+    python -m benchmarks.serialization [--files 500] [--repeat 20]
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from datetime import datetime
+from benchmarks.diff_parser import make_patch
+from benchmarks.hot_paths import make_feedback, make_files
+from services.github.github_service import build_file_tree, light_file
+from utils.compression import brotli as compression_brotli
+from utils.responses import FastJSONResponse, dumps, orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from fastapi.encoders import jsonable_encoder
+except ImportError:
+    jsonable_encoder = None
+
+def make_pr_feedback(files: int, light: bool = False) -> dict:
+    # Misma forma que get_pull_request_feedback
+    files_data = make_files(files)
+    for f in files_data:
+        f["patch"] = make_patch(40)
+    tree = build_file_tree(files_data, light)
+    if light:
+        files_data = [light_file(f) for f in files_data]
+    return {
+        "info": {
+            "title": "Refactor the billing module",
+            "date": "Jun 03, 2025",
+            "author": "octocat",
+            "avatar": "https://avatars.githubusercontent.com/u/583231",
+            "branch_from": "feature/billing",
+            "branch_to": "main",
+            "created_at": datetime(2025, 6, 3, 10, 15, 42, 123456),
+            "analyzed_at": datetime(2025, 6, 3, 10, 18, 2, 654321),
+            "quality": 7.5
+        },
+        "stats": {"files_changed": files, "additions": 12345, "deletions": 6789, "total": 19134},
+        "summary": "The refactor improves structure but leaves several long functions.",
+        "feedback": make_feedback(files),
+        "status": "open",
+        "retro": "analyzed",
+        "recommended_resources": [{"link": "https://example.com", "title": "Clean Code Guide"}],
+        "files": files_data,
+        "file_tree": tree
+    }
+
+def best_time(fn, repeat: int) -> tuple[float, object]:
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def check_app_compression(payload: dict) -> list[str]:
+    """
+    Pide `payload` a través de la pila de middlewares de la app para cada codificación
+    soportada y devuelve las que no llegaron comprimidas.
+    """
+    from starlette.testclient import TestClient
+    import main as app_module
+
+    # Ruta solo para este proceso; sin `with` no se ejecuta el lifespan (ni BD ni workers)
+    app_module.app.add_api_route("/__benchmark/pr-feedback", lambda: FastJSONResponse(payload))
+    client = TestClient(app_module.app)
+
+    encodings = ["gzip"] + (["br"] if compression_brotli is not None else [])
+    failures = []
+    print(f"{'through app':<12} {'encoding':<20} {'bytes':>12}")
+    for encoding in encodings:
+        response = client.get("/__benchmark/pr-feedback", headers={"Accept-Encoding": encoding})
+        content_encoding = response.headers.get("content-encoding", "identity")
+        print(f"{'':<12} {content_encoding:<20} {int(response.headers.get('content-length', 0)):>12,}")
+        if content_encoding != encoding:
+            failures.append(encoding)
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    serializers = {
+        # Lo que hace JSONResponse de Starlette (necesita default=str por los datetime)
+        "json": lambda payload: json.dumps(payload, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "orjson" if orjson is not None else "dumps (json fallback)": dumps
+    }
+    if jsonable_encoder is not None:
+        # Camino por defecto de FastAPI al devolver un dict
+        serializers["jsonable_encoder+json"] = lambda payload: json.dumps(
+            jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    print(f"{'payload':<8} {'serializer':<24} {'time (ms)':>10}")
+    for mode in ("full", "light"):
+        payload = make_pr_feedback(args.files, light=mode == "light")
+        body = None
+        for name, fn in serializers.items():
+            seconds, body = best_time(lambda: fn(payload), args.repeat)
+            print(f"{mode:<8} {name:<24} {seconds * 1000:>10.2f}")
+
+        body = dumps(payload)
+        encodings = {"identity": lambda: body, "gzip-6": lambda: gzip.compress(body, compresslevel=6)}
+        if brotli is not None:
+            encodings["br-4"] = lambda: brotli.compress(body, quality=4)
+            encodings["br-11"] = lambda: brotli.compress(body, quality=11)
+
+        print(f"\n{'payload':<8} {'encoding':<24} {'time (ms)':>10} {'bytes':>12}")
+        for name, fn in encodings.items():
+            seconds, encoded = best_time(fn, max(1, args.repeat // 4))
+            print(f"{mode:<8} {name:<24} {seconds * 1000:>10.2f} {len(encoded):>12,}")
+        print()
+
+    failures = check_app_compression(make_pr_feedback(args.files))
+    if failures:
+        print(f"\n❌ Responses were not compressed by the app for: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ The app compresses JSON responses")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Carga `.env` una sola vez para todo el proceso. Los módulos que leen variables de
+entorno importan este módulo antes de usar `os.getenv`.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Vercel define VERCEL=1 en sus funciones
+IS_SERVERLESS = bool(os.getenv("VERCEL"))
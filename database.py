@@ -1,20 +1,296 @@
+import asyncio
+import hashlib
 import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
 import psycopg2
+from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
+import config  # noqa: F401  (carga .env)
+from utils.log import get_logger
+from utils.metrics import DB_POOL_CONNECTIONS, track_upstream
 
-load_dotenv()
+logger = get_logger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Las conexiones que llevan más de estos segundos sin usarse se verifican con SELECT 1 antes de entregarlas
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30"))
 
-def get_connection():
-    if not DATABASE_URL:
-        raise Exception("❌ DATABASE_URL not found in .env")
-    
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_last_used = {}
+_stats_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "in_use": 0,
+    "waits": 0,
+    "timeouts": 0,
+    "discarded": 0
+}
+
+class TimedCursor(RealDictCursor):
+    """
+    RealDictCursor que registra la latencia de cada consulta en las métricas de Postgres,
+    etiquetada con la operación (SELECT, INSERT, UPDATE...).
+    """
+
+    def execute(self, query, vars=None):
+        with track_upstream("postgres", _sql_operation(query)):
+            return super().execute(query, vars)
+
+def _sql_operation(query) -> str:
+    if isinstance(query, bytes):
+        query = query[:64].decode("utf-8", "ignore")
+    words = str(query).split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+def open_pool():
+    """
+    Crea el pool de conexiones compartido (si no existe todavía) y lo devuelve.
+    """
+    global _pool, _pool_slots
+
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+
+        if not DATABASE_URL:
+            raise Exception("❌ DATABASE_URL not found in .env")
+
+        try:
+            _pool = pool.ThreadedConnectionPool(
+                DB_POOL_MIN_SIZE,
+                DB_POOL_MAX_SIZE,
+                DATABASE_URL,
+                cursor_factory=TimedCursor
+            )
+        except Exception as e:
+            logger.error("❌ Failed to open the database pool.")
+            raise e
+
+        _pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_SIZE)
+        logger.info("✅ Database pool opened (min=%d, max=%d).", DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+        return _pool
+
+def close_pool():
+    global _pool, _pool_slots
+
+    with _pool_lock:
+        if _pool is None:
+            return
+        _pool.closeall()
+        _pool = None
+        _pool_slots = None
+        _last_used.clear()
+        logger.info("👋 Database pool closed.")
+
+def _is_healthy(conn) -> bool:
+    if conn.closed:
+        return False
+
+    last_used = _last_used.get(id(conn))
+    if last_used is not None and time.monotonic() - last_used < DB_POOL_HEALTHCHECK_INTERVAL:
+        return True
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def _count(key: str, amount: int = 1):
+    # get_db() se usa desde el event loop y desde el threadpool de FastAPI a la vez
+    with _stats_lock:
+        _stats[key] += amount
+
+def _checkout(db_pool):
+    # Conexión rota (reinicio de Postgres, timeout del proxy...): se descarta y se pide otra.
+    # Tras un reinicio pueden estarlo todas las inactivas, así que se sigue hasta vaciar el
+    # pool; si ni siquiera una conexión nueva responde, Postgres no está disponible
+    for _ in range(DB_POOL_MAX_SIZE + 1):
+        conn = db_pool.getconn()
+        if _is_healthy(conn):
+            return conn
+
+        _count("discarded")
+        _last_used.pop(id(conn), None)
+        db_pool.putconn(conn, close=True)
+
+    raise Exception("❌ Could not get a healthy database connection")
+
+@contextmanager
+def _lend(db_pool, slots):
+    # Con el hueco del pool ya reservado: entrega una conexión y al terminar la devuelve
+    # (revirtiendo la transacción abierta) y libera el hueco
+    conn = None
     try:
-        conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
-        #print("✅ Connected to the database successfully.")
-        return conn
-    except Exception as e:
-        print("❌ Failed to connect to the database.")
-        raise e
+        conn = _checkout(db_pool)
+        _count("checkouts")
+        _count("in_use")
+        yield conn
+    finally:
+        if conn is not None:
+            _count("in_use", -1)
+            discard = bool(conn.closed)
+            if not discard and conn.status != psycopg2.extensions.STATUS_READY:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+            if discard:
+                _count("discarded")
+                _last_used.pop(id(conn), None)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+            db_pool.putconn(conn, close=discard)
+        slots.release()
+
+def _timed_out():
+    _count("timeouts")
+    return Exception("❌ Timed out waiting for a database connection")
+
+@contextmanager
+def get_db():
+    """
+    Presta una conexión del pool durante el bloque `with` y la devuelve al terminar.
+
+    Si el bloque lanza una excepción, o termina sin hacer commit, la transacción
+    abierta se revierte antes de devolver la conexión al pool.
+
+    Con el pool lleno espera (hasta DB_POOL_TIMEOUT) bloqueando el hilo: desde código
+    async hay que usar get_db_async() o llamar a la función síncrona con asyncio.to_thread.
+    """
+    db_pool = _pool or open_pool()
+    slots = _pool_slots
+
+    if not slots.acquire(blocking=False):
+        _count("waits")
+        if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise _timed_out()
+
+    with _lend(db_pool, slots) as conn:
+        yield conn
+
+@asynccontextmanager
+async def get_db_async():
+    """
+    Como get_db() para código async: si el pool está lleno, la espera por una conexión
+    se hace en un hilo y no bloquea el event loop.
+    """
+    db_pool = _pool or open_pool()
+    slots = _pool_slots
+
+    if not slots.acquire(blocking=False):
+        _count("waits")
+        acquire = asyncio.ensure_future(asyncio.to_thread(slots.acquire, timeout=DB_POOL_TIMEOUT))
+        try:
+            acquired = await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # El hilo sigue esperando: si al final consigue el hueco, se libera
+            acquire.add_done_callback(
+                lambda future: slots.release() if not future.cancelled() and future.result() else None
+            )
+            raise
+        if not acquired:
+            raise _timed_out()
+
+    with _lend(db_pool, slots) as conn:
+        yield conn
+
+def get_pool_stats() -> dict:
+    idle = len(_pool._pool) if _pool is not None else 0
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        "open": _pool is not None,
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "idle": idle,
+        "size": idle + stats["in_use"],
+        **stats
+    }
+
+DB_POOL_CONNECTIONS.set_function(
+    lambda: {("in_use",): _stats["in_use"], ("idle",): len(_pool._pool) if _pool is not None else 0}
+)
+
+def _migration_files() -> list[tuple[str, str]]:
+    # migrations/NNNN_descripcion.sql -> ("NNNN", ruta), en orden de versión
+    files = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if name.endswith(".sql"):
+            files.append((name.split("_", 1)[0], os.path.join(MIGRATIONS_DIR, name)))
+    return files
+
+def run_migrations() -> list[str]:
+    """
+    Aplica, en orden, las migraciones de `migrations/` que no estén en "Schema_Migrations".
+    Cada una va en su propia transacción; un advisory lock evita que dos procesos
+    (p. ej. dos despliegues) las apliquen a la vez. Devuelve los ficheros aplicados.
+    """
+    applied = []
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS "Schema_Migrations" (
+                version TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        ''')
+        conn.commit()
+
+        cur.execute("SELECT pg_advisory_lock(hashtext('Schema_Migrations'))")
+        try:
+            cur.execute('SELECT version, checksum FROM "Schema_Migrations"')
+            done = {row["version"]: row["checksum"] for row in cur.fetchall()}
+            conn.commit()
+
+            for version, path in _migration_files():
+                with open(path, encoding="utf-8") as f:
+                    sql = f.read()
+                checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+                name = os.path.basename(path)
+
+                if version in done:
+                    if done[version] != checksum:
+                        logger.warning("⚠️ Migration %s changed after being applied.", name)
+                    continue
+
+                try:
+                    cur.execute(sql)
+                    cur.execute(
+                        'INSERT INTO "Schema_Migrations" (version, name, checksum) VALUES (%s, %s, %s)',
+                        (version, name, checksum)
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.error("❌ Migration %s failed: %s", name, e)
+                    raise
+                logger.info("✅ Migration applied: %s", name)
+                applied.append(name)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(hashtext('Schema_Migrations'))")
+            conn.commit()
+
+    return applied
+
+if __name__ == "__main__":
+    # python -m database migrate
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        applied = run_migrations()
+        print(f"✅ Database up to date ({len(applied)} migrations applied).")
+    else:
+        print("Usage: python -m database migrate")
@@ -1,33 +1,77 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import sys
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
-from database import get_connection
+from database import open_pool, close_pool
+from services.github.client import open_github_client, close_github_client
+from services.github.event_queue import start_workers, stop_workers
+import config
 from routes import github
+from utils.compression import CompressionMiddleware
+from utils.log import get_logger, setup_logging, stop_logging
+from utils.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
 from fastapi.middleware.cors import CORSMiddleware
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+logger = get_logger(__name__)
+
+# Comprobación de la base de datos al arrancar:
+#   blocking   -> abre el pool antes de aceptar peticiones (por defecto fuera de Vercel)
+#   background -> lo abre en un hilo sin retrasar el arranque; los fallos solo se registran
+#   off        -> no hace nada, el pool se abre con la primera petición que lo use (por defecto en Vercel)
+DB_STARTUP_CHECK = os.getenv("DB_STARTUP_CHECK", "off" if config.IS_SERVERLESS else "blocking").lower()
+
+def _check_database():
     try:
-        conn = get_connection()
-        conn.close()
-        print("✅ Database connection check passed.")
+        open_pool()
+        logger.info("✅ Database connection check passed.")
     except Exception as e:
-        print("❌ Error during database connection check:", e)
+        logger.error("❌ Error during database connection check: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Idempotente; hace falta si un lifespan anterior del mismo proceso llamó a stop_logging
+    setup_logging()
+    if DB_STARTUP_CHECK == "blocking":
+        _check_database()
+    elif DB_STARTUP_CHECK == "background":
+        asyncio.get_running_loop().run_in_executor(None, _check_database)
+
+    open_github_client()
+    # El cliente de Gemini se crea con la primera revisión (get_llm_client)
+    start_workers()
 
     yield
-    print("👋 Shutting down the app.")
+    await stop_workers()
+    # Solo se cierra si algún evento llegó a cargarlo
+    gemini = sys.modules.get("services.llm.gemini")
+    if gemini is not None:
+        await gemini.close_llm_client()
+    await close_github_client()
+    close_pool()
+    logger.info("👋 Shutting down the app.")
+    stop_logging()
 
 app = FastAPI(lifespan=lifespan)
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
 def root():
     return {"message": "🚀 API is running and DB connection works!"}
 
+@app.get("/metrics")
+def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 app.include_router(github.router)
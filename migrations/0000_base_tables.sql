@@ -0,0 +1,52 @@
+-- Tablas base que usa este servicio. Solo se declaran las columnas que lee o escribe
+-- el backend; en una base existente IF NOT EXISTS las deja como están.
+CREATE TABLE IF NOT EXISTS "Employee" (
+    id SERIAL PRIMARY KEY,
+    github_username TEXT,
+    github_token TEXT
+);
+
+CREATE TABLE IF NOT EXISTS "Repositories" (
+    id SERIAL PRIMARY KEY,
+    github_repo_id BIGINT NOT NULL,
+    repo_full_name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS "Commit_Feedback" (
+    id SERIAL PRIMARY KEY,
+    sha TEXT NOT NULL,
+    github_repo_id BIGINT,
+    employee_id INTEGER,
+    github_username TEXT,
+    status TEXT,
+    feedback JSONB,
+    summary TEXT,
+    quality DOUBLE PRECISION,
+    recommended_resources JSONB,
+    created_at TIMESTAMP,
+    analyzed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "PullRequest_Feedback" (
+    id SERIAL PRIMARY KEY,
+    github_repo_id BIGINT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    employee_id INTEGER,
+    github_username TEXT,
+    retro TEXT,
+    feedback JSONB,
+    summary TEXT,
+    quality DOUBLE PRECISION,
+    recommended_resources JSONB,
+    created_at TIMESTAMP,
+    analyzed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS "Github_Event" (
+    id SERIAL PRIMARY KEY,
+    event_type TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    processed_at TIMESTAMP
+);
@@ -0,0 +1,5 @@
+-- Columnas de la cola de procesamiento de webhooks (services/github/event_queue.py)
+ALTER TABLE "Github_Event" ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE "Github_Event" ADD COLUMN IF NOT EXISTS started_at TIMESTAMP;
+ALTER TABLE "Github_Event" ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP;
+ALTER TABLE "Github_Event" ADD COLUMN IF NOT EXISTS last_error TEXT;
@@ -0,0 +1,11 @@
+-- Caché persistente de revisiones por archivo (services/llm/review_cache.py)
+CREATE TABLE IF NOT EXISTS "Review_Cache" (
+    cache_key TEXT PRIMARY KEY,
+    prompt_version TEXT NOT NULL,
+    comments JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    last_hit_at TIMESTAMP,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS "Review_Cache_created_at_idx" ON "Review_Cache" (created_at);
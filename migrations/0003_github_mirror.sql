@@ -0,0 +1,48 @@
+-- Espejo local de commits y PRs alimentado por los webhooks (services/github/mirror.py)
+CREATE TABLE IF NOT EXISTS "Github_Commit" (
+    github_repo_id BIGINT NOT NULL,
+    repo_full_name TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    message TEXT,
+    author_login TEXT,
+    author_name TEXT,
+    committed_at TIMESTAMP,
+    verified BOOLEAN NOT NULL DEFAULT FALSE,
+    additions INTEGER,
+    deletions INTEGER,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (github_repo_id, branch, sha)
+);
+
+CREATE INDEX IF NOT EXISTS "Github_Commit_repo_branch_committed_idx"
+    ON "Github_Commit" (repo_full_name, branch, committed_at DESC);
+CREATE INDEX IF NOT EXISTS "Github_Commit_repo_sha_idx"
+    ON "Github_Commit" (github_repo_id, sha);
+
+CREATE TABLE IF NOT EXISTS "Github_PullRequest" (
+    github_repo_id BIGINT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    repo_full_name TEXT NOT NULL,
+    title TEXT,
+    state TEXT,
+    author_login TEXT,
+    requested_reviewers TEXT[] NOT NULL DEFAULT '{}',
+    head_ref TEXT,
+    base_ref TEXT,
+    head_sha TEXT,
+    main_file TEXT,
+    comments INTEGER NOT NULL DEFAULT 0,
+    review_comments INTEGER NOT NULL DEFAULT 0,
+    additions INTEGER,
+    deletions INTEGER,
+    changed_files INTEGER,
+    created_at TIMESTAMP,
+    closed_at TIMESTAMP,
+    merged_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (github_repo_id, pr_number)
+);
+
+CREATE INDEX IF NOT EXISTS "Github_PullRequest_repo_full_name_idx"
+    ON "Github_PullRequest" (repo_full_name, pr_number DESC);
@@ -0,0 +1,16 @@
+-- Agregados del dashboard por (repo, usuario, día, tipo), mantenidos por services/github/aggregates.py
+CREATE TABLE IF NOT EXISTS "Dashboard_Daily" (
+    github_repo_id BIGINT NOT NULL,
+    github_username TEXT NOT NULL,
+    day DATE NOT NULL,
+    kind TEXT NOT NULL,
+    items INTEGER NOT NULL DEFAULT 0,
+    quality_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    quality_count INTEGER NOT NULL DEFAULT 0,
+    lines_added BIGINT NOT NULL DEFAULT 0,
+    lines_deleted BIGINT NOT NULL DEFAULT 0,
+    merged_count INTEGER NOT NULL DEFAULT 0,
+    merge_days_sum BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (github_repo_id, github_username, day, kind)
+);
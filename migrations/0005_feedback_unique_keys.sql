@@ -0,0 +1,36 @@
+-- Claves únicas que usan los upserts de los handlers (ON CONFLICT).
+-- Antes se borran los duplicados que hayan dejado entregas concurrentes. De cada grupo se
+-- conserva la fila con el análisis terminado (analyzed / not_analyzed) y, entre esas, la de
+-- menor id; así no se pierde un análisis completo por quedarse con un "analyzing" a medias.
+DELETE FROM "Commit_Feedback"
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY sha
+                   ORDER BY (status IN ('analyzed', 'not_analyzed')) IS TRUE DESC, id
+               ) AS rank
+        FROM "Commit_Feedback"
+        WHERE sha IS NOT NULL
+    ) ranked
+    WHERE rank > 1
+);
+
+DELETE FROM "PullRequest_Feedback"
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY github_repo_id, pr_number
+                   ORDER BY (retro IN ('analyzed', 'not_analyzed')) IS TRUE DESC, id
+               ) AS rank
+        FROM "PullRequest_Feedback"
+        WHERE github_repo_id IS NOT NULL AND pr_number IS NOT NULL
+    ) ranked
+    WHERE rank > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS "Commit_Feedback_sha_key"
+    ON "Commit_Feedback" (sha);
+CREATE UNIQUE INDEX IF NOT EXISTS "PullRequest_Feedback_repo_pr_key"
+    ON "PullRequest_Feedback" (github_repo_id, pr_number);
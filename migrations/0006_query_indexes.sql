@@ -0,0 +1,19 @@
+-- Índices para las consultas más frecuentes (ver scripts/check_indexes.py).
+-- Commit_Feedback(sha) y PullRequest_Feedback(github_repo_id, pr_number) ya son únicos (0005).
+
+-- Dashboard y agregados: filtros por (repo, usuario), recientes por created_at
+CREATE INDEX IF NOT EXISTS "Commit_Feedback_repo_user_created_idx"
+    ON "Commit_Feedback" (github_repo_id, github_username, created_at DESC);
+CREATE INDEX IF NOT EXISTS "PullRequest_Feedback_repo_user_created_idx"
+    ON "PullRequest_Feedback" (github_repo_id, github_username, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS "Repositories_repo_full_name_idx"
+    ON "Repositories" (repo_full_name);
+CREATE INDEX IF NOT EXISTS "Employee_github_username_idx"
+    ON "Employee" (github_username);
+
+-- Cola de webhooks: solo las filas pendientes o en proceso, que son las que buscan los workers
+CREATE INDEX IF NOT EXISTS "Github_Event_pending_idx"
+    ON "Github_Event" (id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS "Github_Event_processing_idx"
+    ON "Github_Event" (started_at) WHERE status = 'processing';
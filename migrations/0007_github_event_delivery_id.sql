@@ -0,0 +1,6 @@
+-- Id de entrega de GitHub (cabecera X-GitHub-Delivery) para ignorar las reentregas.
+-- Los eventos antiguos quedan con NULL, que no choca con la restricción única.
+ALTER TABLE "Github_Event" ADD COLUMN IF NOT EXISTS delivery_id TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS "Github_Event_delivery_id_key"
+    ON "Github_Event" (delivery_id);
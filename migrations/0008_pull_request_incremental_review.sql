@@ -0,0 +1,4 @@
+-- Head analizado y huella del patch de cada archivo ({"ruta": sha256}), para que en
+-- `synchronize` solo se vuelvan a revisar los archivos cuyo patch cambió.
+ALTER TABLE "PullRequest_Feedback" ADD COLUMN IF NOT EXISTS head_sha TEXT;
+ALTER TABLE "PullRequest_Feedback" ADD COLUMN IF NOT EXISTS file_fingerprints JSONB;
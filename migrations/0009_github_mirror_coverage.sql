@@ -0,0 +1,13 @@
+-- Qué parte del historial tiene el espejo completa. Los webhooks solo traen lo que pasa
+-- después de configurarlos, así que el espejo responde a una lectura únicamente cuando hay
+-- una fila aquí (la escribe `python -m services.github.mirror sync`); si no, se lee de GitHub.
+CREATE TABLE IF NOT EXISTS "Github_Mirror_Coverage" (
+    repo_full_name TEXT NOT NULL,
+    -- 'commits' (por rama) o 'pull_requests' (branch = '')
+    kind TEXT NOT NULL,
+    branch TEXT NOT NULL DEFAULT '',
+    -- NULL: historial completo; si no, solo lo posterior a esta fecha
+    complete_since TIMESTAMP,
+    synced_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (repo_full_name, kind, branch)
+);
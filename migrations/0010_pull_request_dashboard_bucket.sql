@@ -0,0 +1,13 @@
+-- Bucket de "Dashboard_Daily" en el que se contó cada PR la última vez. El día del PR
+-- puede cambiar (llega la fila del espejo con la fecha de GitHub, se reanaliza y cambia
+-- created_at...): al recalcular se rehacen el bucket anterior y el nuevo.
+ALTER TABLE "PullRequest_Feedback" ADD COLUMN IF NOT EXISTS dashboard_username TEXT;
+ALTER TABLE "PullRequest_Feedback" ADD COLUMN IF NOT EXISTS dashboard_day DATE;
+
+UPDATE "PullRequest_Feedback" f
+SET dashboard_username = f.github_username,
+    dashboard_day = COALESCE(gp.created_at, f.created_at)::date
+FROM "PullRequest_Feedback" f2
+LEFT JOIN "Github_PullRequest" gp
+    ON gp.github_repo_id = f2.github_repo_id AND gp.pr_number = f2.pr_number
+WHERE f2.id = f.id AND f.dashboard_day IS NULL;
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Request, Depends, Query
+import asyncio
+import hmac
+from fastapi import APIRouter, Request, Depends, Header, HTTPException, Query
 from starlette.responses import JSONResponse
-import traceback
 from utils.auth import get_user_id_from_jwt
 from services.github.github_service import (
+    COMMITS_PAGE_SIZE,
     get_pull_request_feedback,
     get_repo_dashboard,
     get_user_github_credentials,
@@ -10,77 +12,156 @@ from services.github.github_service import (
     get_grouped_commits,
     get_pull_requests,
     get_commit_feedback,
-    fetch_github_branches,
-    process_github_event
+    get_commit_file_feedback,
+    get_pull_request_file_feedback,
+    fetch_github_branches
 )
+from services.github.event_queue import CRON_SECRET, drain_events, enqueue_github_event, get_queue_depth, get_queue_stats
+from services.github.client import get_github_cache_stats
+from services.llm.review_cache import get_review_cache_stats
+from services.github.credentials import invalidate_credentials, get_credentials_cache_stats
+from database import get_pool_stats
+from utils.log import get_logger
+from utils.responses import FastJSONResponse
 
-router = APIRouter()
+logger = get_logger(__name__)
+
+router = APIRouter(default_response_class=FastJSONResponse)
 
 @router.get("/github/repos")
-def get_repos(user_id: int = Depends(get_user_id_from_jwt)):
-    token, _ = get_user_github_credentials(user_id)
-    return fetch_github_repos(token)
+async def get_repos(user_id: int = Depends(get_user_id_from_jwt)):
+    token, _ = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await fetch_github_repos(token))
+
+@router.post("/github/credentials/refresh")
+def refresh_credentials(user_id: int = Depends(get_user_id_from_jwt)):
+    invalidate_credentials(user_id=user_id)
+    return {"message": "✅ GitHub credentials will be reloaded on the next request."}
 
 @router.get("/github/commits")
 async def commits(
     repo: str = Query(..., description="Formato: owner/repo"),
     branch: str = Query("main"),
+    cursor: int | None = Query(None, ge=1, description="Valor de X-Next-Cursor de la página anterior"),
+    limit: int = Query(COMMITS_PAGE_SIZE, ge=1, le=100),
+    since: str | None = Query(None, description="ISO 8601, p. ej. 2025-01-01T00:00:00Z"),
+    until: str | None = Query(None, description="ISO 8601, p. ej. 2025-02-01T00:00:00Z"),
     user_id: int = Depends(get_user_id_from_jwt)
 ):
-    token, username = get_user_github_credentials(user_id)
-    return await get_grouped_commits(token, repo, branch, username)
+    token, username = await asyncio.to_thread(get_user_github_credentials, user_id)
+    grouped, next_cursor = await get_grouped_commits(
+        token, repo, branch, username,
+        cursor=cursor, limit=limit, since=since, until=until
+    )
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(grouped, headers=headers)
 
 @router.get("/github/pull-requests")
 async def pull_requests(
     repo: str = Query(..., description="Formato: owner/repo"),
     user_id: int = Depends(get_user_id_from_jwt)
 ):
-    token, username = get_user_github_credentials(user_id)
-    return await get_pull_requests(token, repo, username)
+    token, username = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await get_pull_requests(token, repo, username))
+
+def parse_fields(fields: str | None) -> set[str] | None:
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(",") if field.strip()}
 
 @router.get("/github/commit-feedback")
 async def commit_feedback(
     repo: str = Query(..., description="Formato: owner/repo"),
     sha: str = Query(...),
+    fields: str | None = Query(None, description="Claves a devolver separadas por comas, p. ej. info,stats,summary,file_tree"),
+    tree: str = Query("full", pattern="^(full|light)$", description="light: archivos sin patch (ver /github/commit-feedback/file)"),
     user_id: int = Depends(get_user_id_from_jwt)
 ):
-    token, _ = get_user_github_credentials(user_id)
-    return await get_commit_feedback(token, repo, sha)
+    token, _ = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await get_commit_feedback(token, repo, sha, fields=parse_fields(fields), light=tree == "light"))
+
+@router.get("/github/commit-feedback/file")
+async def commit_file_feedback(
+    repo: str = Query(..., description="Formato: owner/repo"),
+    sha: str = Query(...),
+    path: str = Query(..., description="Ruta del archivo en el commit"),
+    user_id: int = Depends(get_user_id_from_jwt)
+):
+    token, _ = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await get_commit_file_feedback(token, repo, sha, path))
 
 @router.get("/github/pull-request-feedback")
 async def pull_request_feedback(
     repo: str = Query(..., description="Formato: owner/repo"),
     pr_number: int = Query(..., description="Número del Pull Request"),
+    fields: str | None = Query(None, description="Claves a devolver separadas por comas, p. ej. info,stats,summary,file_tree"),
+    tree: str = Query("full", pattern="^(full|light)$", description="light: archivos sin patch (ver /github/pull-request-feedback/file)"),
     user_id: int = Depends(get_user_id_from_jwt)
 ):
-    token, _ = get_user_github_credentials(user_id)
-    return await get_pull_request_feedback(token, repo, pr_number)
+    token, _ = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await get_pull_request_feedback(token, repo, pr_number, fields=parse_fields(fields), light=tree == "light"))
+
+@router.get("/github/pull-request-feedback/file")
+async def pull_request_file_feedback(
+    repo: str = Query(..., description="Formato: owner/repo"),
+    pr_number: int = Query(..., description="Número del Pull Request"),
+    path: str = Query(..., description="Ruta del archivo en el PR"),
+    user_id: int = Depends(get_user_id_from_jwt)
+):
+    token, _ = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await get_pull_request_file_feedback(token, repo, pr_number, path))
 
 @router.get("/github/branches")
 async def get_branches(
     repo: str = Query(..., description="Formato: owner/repo"),
     user_id: int = Depends(get_user_id_from_jwt)
 ):
-    token, _ = get_user_github_credentials(user_id)
-    return await fetch_github_branches(token, repo)
+    token, _ = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await fetch_github_branches(token, repo))
 
 @router.post("/github/webhook")
 async def github_webhook(request: Request):
     try:
         payload = await request.json()
         event_type = request.headers.get("X-GitHub-Event", "unknown")
-        await process_github_event(event_type, payload)
-        return JSONResponse(status_code=200, content={"message": "✅ Event received."})
+        delivery_id = request.headers.get("X-GitHub-Delivery")
+        event_id = await asyncio.to_thread(enqueue_github_event, event_type, payload, delivery_id)
+        if event_id is None:
+            return JSONResponse(status_code=200, content={"message": "✅ Duplicate delivery ignored.", "delivery_id": delivery_id})
+        return JSONResponse(status_code=200, content={"message": "✅ Event queued.", "event_id": event_id})
     
     except Exception as e:
-        print("❌ Error in webhook endpoint:", str(e))
-        traceback.print_exc()
+        logger.exception("❌ Error in webhook endpoint: %s", e)
         return JSONResponse(status_code=500, content={"message": "❌ Failed to process webhook."})
 
+def require_cron_secret(authorization: str | None = Header(None)):
+    # Endpoints internos (cron y estadísticas): "Authorization: Bearer <CRON_SECRET>"
+    if not CRON_SECRET or not hmac.compare_digest(authorization or "", f"Bearer {CRON_SECRET}"):
+        raise HTTPException(status_code=401, detail="Invalid cron secret")
+
+@router.get("/github/webhook/drain", dependencies=[Depends(require_cron_secret)])
+async def drain_webhook_queue():
+    # Para Vercel Cron: sin workers en segundo plano, la cola se vacía en cada ejecución
+    processed = await drain_events()
+    return {"processed": processed, "depth": await asyncio.to_thread(get_queue_depth)}
+
+@router.get("/github/webhook/stats", dependencies=[Depends(require_cron_secret)])
+def webhook_stats():
+    return get_queue_stats()
+
+@router.get("/github/cache/stats", dependencies=[Depends(require_cron_secret)])
+def cache_stats():
+    return {
+        "github_responses": get_github_cache_stats(),
+        "llm_reviews": get_review_cache_stats(),
+        "credentials": get_credentials_cache_stats(),
+        "database_pool": get_pool_stats()
+    }
+
 @router.get("/github/repo-dashboard")
 async def repo_dashboard(
     repo_full_name: str = Query(..., alias="repo"),
     user_id: int = Depends(get_user_id_from_jwt)
 ):
-    token, username = get_user_github_credentials(user_id)
-    return await get_repo_dashboard(repo_full_name, token, username)
+    token, username = await asyncio.to_thread(get_user_github_credentials, user_id)
+    return FastJSONResponse(await get_repo_dashboard(repo_full_name, token, username))
@@ -0,0 +1,147 @@
+"""
+Comprueba con EXPLAIN que las consultas frecuentes del backend usan un índice.
+
+Con `enable_seqscan = off` el planificador solo elige un Seq Scan cuando no existe
+ningún índice utilizable, así que el resultado no depende del tamaño de las tablas
+(en una base casi vacía Postgres preferiría el Seq Scan igualmente).
+
+No basta con que no haya Seq Scan: sin él Postgres recorre entero cualquier btree de la
+tabla y filtra. Cada consulta indica los índices que debe usar, y cada uno tiene que
+aparecer en el plan con un `Index Cond` (salvo los parciales, cuyo predicado ya es el filtro).
+
+    python -m scripts.check_indexes
+"""
+import sys
+from datetime import date, datetime
+from database import get_db
+from services.github.aggregates import BUCKET_WHERE, COMMIT_BUCKETS_SQL, DASHBOARD_AGGREGATES_SQL, PR_BUCKETS_SQL
+from services.github.credentials import EMPLOYEES_BY_USERNAME_SQL
+from services.github.event_queue import ABANDON_EVENTS_SQL, CLAIM_EVENT_SQL
+from services.github.github_service import (
+    COMMIT_FEEDBACK_SQL,
+    COMMIT_FILE_FEEDBACK_SQL,
+    COMMIT_STATUSES_SQL,
+    DASHBOARD_RECENT_COMMITS_SQL,
+    DASHBOARD_RECENT_PRS_SQL,
+    DASHBOARD_REPO_SQL,
+    PR_FEEDBACK_SQL,
+    PR_FILE_FEEDBACK_SQL,
+    PR_RETROS_SQL
+)
+from services.github.mirror import MIRROR_COVERAGE_SQL, MIRRORED_COMMITS_SQL, MIRRORED_PULL_REQUESTS_SQL
+
+NOW = datetime.utcnow()
+SHA = "0" * 40
+BUCKET = {"repo_id": 1, "username": "user", "day": date.today(), "now": NOW}
+
+# Índices parciales: recorrerlos enteros es correcto, solo contienen las filas buscadas
+PARTIAL_INDEXES = {"Github_Event_pending_idx", "Github_Event_processing_idx"}
+
+# (descripción, consulta, parámetros, índices esperados): las consultas se importan de los
+# módulos que las ejecutan, así que lo que se comprueba es exactamente lo que corre en producción
+QUERIES = [
+    ("get_grouped_commits: estado de los commits", COMMIT_STATUSES_SQL, ([SHA],), ["Commit_Feedback_sha_key"]),
+    ("get_pull_requests: retro de los PRs", PR_RETROS_SQL, (1, [1, 2]), ["PullRequest_Feedback_repo_pr_key"]),
+    ("get_commit_feedback", COMMIT_FEEDBACK_SQL, (SHA,), ["Commit_Feedback_sha_key"]),
+    ("get_pull_request_feedback", PR_FEEDBACK_SQL, (1, 1), ["PullRequest_Feedback_repo_pr_key"]),
+    ("get_commit_file_feedback", COMMIT_FILE_FEEDBACK_SQL, (SHA,), ["Commit_Feedback_sha_key"]),
+    ("get_pull_request_file_feedback", PR_FILE_FEEDBACK_SQL, (1, 1), ["PullRequest_Feedback_repo_pr_key"]),
+    ("get_repo_dashboard: repositorio", DASHBOARD_REPO_SQL, ("owner/repo",), ["Repositories_repo_full_name_idx"]),
+    ("get_repo_dashboard: agregados", DASHBOARD_AGGREGATES_SQL, (1, "user"), ["Dashboard_Daily_pkey"]),
+    (
+        "get_repo_dashboard: PRs recientes",
+        DASHBOARD_RECENT_PRS_SQL,
+        (1, "user"),
+        ["PullRequest_Feedback_repo_user_created_idx", "Github_PullRequest_pkey"]
+    ),
+    (
+        "get_repo_dashboard: commits recientes",
+        DASHBOARD_RECENT_COMMITS_SQL,
+        (1, "user"),
+        ["Commit_Feedback_repo_user_created_idx"]
+    ),
+    (
+        "aggregates: bucket de PRs",
+        PR_BUCKETS_SQL.format(where=BUCKET_WHERE["pr"]),
+        BUCKET,
+        ["PullRequest_Feedback_repo_user_created_idx"]
+    ),
+    (
+        "aggregates: bucket de commits",
+        COMMIT_BUCKETS_SQL.format(where=BUCKET_WHERE["commit"]),
+        BUCKET,
+        ["Commit_Feedback_repo_user_created_idx", "Github_Commit_repo_sha_idx"]
+    ),
+    (
+        "credentials: empleados por usuario de GitHub",
+        EMPLOYEES_BY_USERNAME_SQL,
+        (["user"],),
+        ["Employee_github_username_idx"]
+    ),
+    (
+        "mirror: cobertura del espejo",
+        MIRROR_COVERAGE_SQL,
+        ("owner/repo", "commits", "main"),
+        ["Github_Mirror_Coverage_pkey"]
+    ),
+    (
+        "mirror: commits de una rama",
+        MIRRORED_COMMITS_SQL,
+        ("owner/repo", "main", "user", "user", None, None, None, None, 0, 100),
+        ["Github_Commit_repo_branch_committed_idx"]
+    ),
+    (
+        "mirror: PRs de un repositorio",
+        MIRRORED_PULL_REQUESTS_SQL,
+        ("owner/repo",),
+        ["Github_PullRequest_repo_full_name_idx"]
+    ),
+    (
+        "event_queue: eventos abandonados sin intentos",
+        ABANDON_EVENTS_SQL,
+        ("", NOW, 5),
+        ["Github_Event_processing_idx"]
+    ),
+    (
+        "event_queue: siguiente evento pendiente",
+        CLAIM_EVENT_SQL,
+        (NOW, NOW, NOW, 5),
+        ["Github_Event_pending_idx", "Github_Event_processing_idx", "Github_Event_pkey"]
+    ),
+]
+
+def _index_lookups(plan: dict) -> set[str]:
+    """
+    Índices que el plan usa como búsqueda: nodos Index Scan / Index Only Scan / Bitmap
+    Index Scan con `Index Cond` (en un Bitmap Heap Scan la condición está en el hijo,
+    y el `Recheck Cond` del padre es la misma), o índices parciales aunque no lo tengan.
+    """
+    found = set()
+    index_name = plan.get("Index Name")
+    if index_name and ("Index Cond" in plan or index_name in PARTIAL_INDEXES):
+        found.add(index_name)
+    for child in plan.get("Plans", []):
+        found |= _index_lookups(child)
+    return found
+
+def check_indexes() -> list[tuple[str, list[str]]]:
+    """
+    Devuelve [(descripción, índices esperados que el plan no usa)] de las consultas que fallan.
+    """
+    failures = []
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for description, sql, params, expected in QUERIES:
+            cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            row = cur.fetchone()
+            plan = row["QUERY PLAN"][0]["Plan"]
+            missing = [name for name in expected if name not in _index_lookups(plan)]
+            print(f"{'❌' if missing else '✅'} {description}" + (f" (not used: {', '.join(missing)})" if missing else ""))
+            if missing:
+                failures.append((description, missing))
+        conn.rollback()
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_indexes() else 0)
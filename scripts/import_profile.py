@@ -0,0 +1,79 @@
+"""
+Informe de tiempos de importación de la app (`python -X importtime`): qué módulos pesan
+más al arrancar en frío. Se ejecuta en un proceso nuevo para que nada esté ya en caché.
+
+    python -m scripts.import_profile [--module main] [--top 25]
+    python -m scripts.import_profile --json imports.json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+# import time: self [us] | cumulative | imported package
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile_imports(module: str) -> list[dict]:
+    """
+    [{module, self_us, cumulative_us, depth}] de cada módulo importado por `module`,
+    en el orden en que Python termina de cargarlos.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ Could not import {module}:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "module": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                # Python sangra dos espacios por nivel a partir del primero
+                "depth": (len(indent) - 1) // 2
+            })
+    return entries
+
+def top_level_packages(entries: list[dict]) -> dict[str, int]:
+    # Tiempo propio agregado por paquete raíz (fastapi, pydantic, psycopg2...)
+    totals = {}
+    for entry in entries:
+        root = entry["module"].split(".")[0]
+        totals[root] = totals.get(root, 0) + entry["self_us"]
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", help="Guarda el perfil completo en este fichero")
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    total_us = next((e["cumulative_us"] for e in reversed(entries) if e["module"] == args.module), 0)
+
+    print(f"Import of {args.module}: {total_us / 1000:.1f} ms, {len(entries)} modules\n")
+
+    print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+    for entry in sorted(entries, key=lambda e: e["cumulative_us"], reverse=True)[:args.top]:
+        print(f"{entry['cumulative_us'] / 1000:>16.1f} {entry['self_us'] / 1000:>10.1f}  {'  ' * entry['depth']}{entry['module']}")
+
+    print(f"\n{'self (ms)':>10}  package")
+    packages = sorted(top_level_packages(entries).items(), key=lambda item: item[1], reverse=True)
+    for name, self_us in packages[:args.top]:
+        print(f"{self_us / 1000:>10.1f}  {name}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"module": args.module, "total_us": total_us, "imports": entries}, f, indent=2)
+        print(f"\n✅ Profile written to {args.json}")
+
+if __name__ == "__main__":
+    main()
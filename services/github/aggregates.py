@@ -0,0 +1,210 @@
+import sys
+from datetime import datetime
+from psycopg2.extras import execute_batch
+from database import get_db
+
+# Cada fila de "Dashboard_Daily" resume los PRs o commits analizados de un usuario en un
+# repositorio para un día. Las dos consultas calculan esos buckets a partir de las tablas
+# de feedback y del espejo; `{where}` las limita a un bucket concreto o las deja para todos.
+#
+# Día de un PR: fecha de creación en GitHub (o la del feedback si el espejo no lo tiene).
+# Día de un commit: fecha de creación del feedback.
+PR_BUCKETS_SQL = '''
+    INSERT INTO "Dashboard_Daily"
+        (github_repo_id, github_username, day, kind, items, quality_sum, quality_count,
+         lines_added, lines_deleted, merged_count, merge_days_sum, updated_at)
+    SELECT f.github_repo_id,
+           f.github_username,
+           COALESCE(gp.created_at, f.created_at)::date AS day,
+           'pr',
+           COUNT(*),
+           COALESCE(SUM(f.quality), 0),
+           COUNT(*) FILTER (WHERE f.quality <> 0),
+           COALESCE(SUM(gp.additions), 0),
+           COALESCE(SUM(gp.deletions), 0),
+           COUNT(*) FILTER (WHERE gp.merged_at IS NOT NULL),
+           COALESCE(SUM(gp.merged_at::date - gp.created_at::date) FILTER (WHERE gp.merged_at IS NOT NULL), 0),
+           %(now)s
+    FROM "PullRequest_Feedback" f
+    LEFT JOIN "Github_PullRequest" gp
+        ON gp.github_repo_id = f.github_repo_id AND gp.pr_number = f.pr_number
+    WHERE f.github_username IS NOT NULL
+      AND COALESCE(gp.created_at, f.created_at) IS NOT NULL
+      {where}
+    GROUP BY 1, 2, 3
+    ON CONFLICT (github_repo_id, github_username, day, kind) DO UPDATE
+    SET items = EXCLUDED.items,
+        quality_sum = EXCLUDED.quality_sum,
+        quality_count = EXCLUDED.quality_count,
+        lines_added = EXCLUDED.lines_added,
+        lines_deleted = EXCLUDED.lines_deleted,
+        merged_count = EXCLUDED.merged_count,
+        merge_days_sum = EXCLUDED.merge_days_sum,
+        updated_at = EXCLUDED.updated_at
+'''
+
+COMMIT_BUCKETS_SQL = '''
+    INSERT INTO "Dashboard_Daily"
+        (github_repo_id, github_username, day, kind, items, quality_sum, quality_count,
+         lines_added, lines_deleted, merged_count, merge_days_sum, updated_at)
+    SELECT f.github_repo_id,
+           f.github_username,
+           f.created_at::date AS day,
+           'commit',
+           COUNT(*),
+           COALESCE(SUM(f.quality), 0),
+           COUNT(f.quality),
+           COALESCE(SUM(c.additions), 0),
+           COALESCE(SUM(c.deletions), 0),
+           0,
+           0,
+           %(now)s
+    FROM "Commit_Feedback" f
+    LEFT JOIN LATERAL (
+        SELECT additions, deletions FROM "Github_Commit"
+        WHERE github_repo_id = f.github_repo_id AND sha = f.sha AND additions IS NOT NULL
+        LIMIT 1
+    ) c ON TRUE
+    WHERE f.github_username IS NOT NULL
+      AND f.created_at IS NOT NULL
+      {where}
+    GROUP BY 1, 2, 3
+    ON CONFLICT (github_repo_id, github_username, day, kind) DO UPDATE
+    SET items = EXCLUDED.items,
+        quality_sum = EXCLUDED.quality_sum,
+        quality_count = EXCLUDED.quality_count,
+        lines_added = EXCLUDED.lines_added,
+        lines_deleted = EXCLUDED.lines_deleted,
+        updated_at = EXCLUDED.updated_at
+'''
+
+# Filtro de un solo bucket para PR_BUCKETS_SQL / COMMIT_BUCKETS_SQL
+BUCKET_WHERE = {
+    "pr": "AND f.github_repo_id = %(repo_id)s AND f.github_username = %(username)s "
+          "AND COALESCE(gp.created_at, f.created_at)::date = %(day)s",
+    "commit": "AND f.github_repo_id = %(repo_id)s AND f.github_username = %(username)s "
+              "AND f.created_at::date = %(day)s"
+}
+
+DASHBOARD_AGGREGATES_SQL = '''
+    SELECT day, kind, items, quality_sum, quality_count, lines_added, lines_deleted,
+           merged_count, merge_days_sum
+    FROM "Dashboard_Daily"
+    WHERE github_repo_id = %s AND github_username = %s
+    ORDER BY day
+'''
+
+def _refresh_buckets(cur, kind: str, buckets: set):
+    sql = (PR_BUCKETS_SQL if kind == "pr" else COMMIT_BUCKETS_SQL).format(where=BUCKET_WHERE[kind])
+
+    for repo_id, username, day in buckets:
+        params = {"repo_id": repo_id, "username": username, "day": day, "now": datetime.utcnow()}
+        # Si el bucket se ha quedado vacío el INSERT ... SELECT no produce filas: se pone a cero antes
+        cur.execute(
+            '''
+            UPDATE "Dashboard_Daily"
+            SET items = 0, quality_sum = 0, quality_count = 0, lines_added = 0, lines_deleted = 0,
+                merged_count = 0, merge_days_sum = 0, updated_at = %(now)s
+            WHERE github_repo_id = %(repo_id)s AND github_username = %(username)s
+              AND day = %(day)s AND kind = %(kind)s
+            ''',
+            {**params, "kind": kind}
+        )
+        cur.execute(sql, params)
+
+def refresh_event_aggregates(conn, event_type: str, payload: dict):
+    """
+    Recalcula los buckets de "Dashboard_Daily" que toca un evento ya procesado: los días de
+    los commits de un push o el día del PR (también cuando se mergea o se cierra).
+    """
+    repo_id = payload.get("repository", {}).get("id")
+    cur = conn.cursor()
+
+    if event_type == "push":
+        shas = [commit.get("id") for commit in payload.get("commits", []) if commit.get("id")]
+        if not shas:
+            return
+        cur.execute(
+            '''
+            SELECT DISTINCT github_repo_id, github_username, created_at::date AS day
+            FROM "Commit_Feedback"
+            WHERE github_repo_id = %s AND sha = ANY(%s) AND github_username IS NOT NULL AND created_at IS NOT NULL
+            ''',
+            (repo_id, shas)
+        )
+        buckets = {(row["github_repo_id"], row["github_username"], row["day"]) for row in cur.fetchall()}
+        _refresh_buckets(cur, "commit", buckets)
+
+    elif event_type == "pull_request":
+        refresh_pull_request_buckets(cur, repo_id, [payload.get("pull_request", {}).get("number")])
+
+    conn.commit()
+
+def refresh_pull_request_buckets(cur, github_repo_id: int, pr_numbers: list[int]):
+    """
+    Recalcula los buckets de los PRs dados: el que les toca ahora y, si se han movido (el
+    espejo trae la fecha de GitHub, cambia el autor...), aquel en el que se contaron antes,
+    guardado en dashboard_username/dashboard_day. No hace commit.
+    """
+    cur.execute(
+        '''
+        SELECT f.id, f.github_repo_id, f.github_username, f.dashboard_username, f.dashboard_day,
+               COALESCE(gp.created_at, f.created_at)::date AS day
+        FROM "PullRequest_Feedback" f
+        LEFT JOIN "Github_PullRequest" gp
+            ON gp.github_repo_id = f.github_repo_id AND gp.pr_number = f.pr_number
+        WHERE f.github_repo_id = %s AND f.pr_number = ANY(%s)
+        ''',
+        (github_repo_id, pr_numbers)
+    )
+    rows = cur.fetchall()
+
+    buckets = set()
+    for row in rows:
+        if row["github_username"] is not None and row["day"] is not None:
+            buckets.add((row["github_repo_id"], row["github_username"], row["day"]))
+        if row["dashboard_username"] is not None and row["dashboard_day"] is not None:
+            buckets.add((row["github_repo_id"], row["dashboard_username"], row["dashboard_day"]))
+    _refresh_buckets(cur, "pr", buckets)
+
+    execute_batch(
+        cur,
+        'UPDATE "PullRequest_Feedback" SET dashboard_username = %s, dashboard_day = %s WHERE id = %s',
+        [(row["github_username"], row["day"], row["id"]) for row in rows]
+    )
+
+def rebuild_dashboard_aggregates():
+    """
+    Reconstruye "Dashboard_Daily" entera desde las tablas de feedback (carga inicial o reparación).
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('DELETE FROM "Dashboard_Daily"')
+        cur.execute(PR_BUCKETS_SQL.format(where=""), {"now": datetime.utcnow()})
+        cur.execute(COMMIT_BUCKETS_SQL.format(where=""), {"now": datetime.utcnow()})
+        cur.execute(
+            '''
+            UPDATE "PullRequest_Feedback" f
+            SET dashboard_username = f.github_username,
+                dashboard_day = COALESCE(gp.created_at, f.created_at)::date
+            FROM "PullRequest_Feedback" f2
+            LEFT JOIN "Github_PullRequest" gp
+                ON gp.github_repo_id = f2.github_repo_id AND gp.pr_number = f2.pr_number
+            WHERE f2.id = f.id
+            '''
+        )
+        cur.execute('SELECT COUNT(*) AS count FROM "Dashboard_Daily"')
+        count = cur.fetchone()["count"]
+        conn.commit()
+    return count
+
+def get_dashboard_aggregates(cur, github_repo_id: int, username: str) -> list[dict]:
+    cur.execute(DASHBOARD_AGGREGATES_SQL, (github_repo_id, username))
+    return cur.fetchall()
+
+if __name__ == "__main__":
+    # python -m services.github.aggregates rebuild
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        print(f"✅ Dashboard aggregates rebuilt: {rebuild_dashboard_aggregates()} buckets.")
+    else:
+        print("Usage: python -m services.github.aggregates rebuild")
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import os
+import re
+import httpx
+import config  # noqa: F401  (carga .env)
+from fastapi import HTTPException
+from utils.cache import LRUCache
+from utils.log import get_logger
+from utils.metrics import track_upstream
+
+logger = get_logger(__name__)
+
+GITHUB_API = "https://api.github.com"
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "15"))
+GITHUB_CONNECT_TIMEOUT = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "5"))
+GITHUB_MAX_CONNECTIONS = int(os.getenv("GITHUB_MAX_CONNECTIONS", "50"))
+GITHUB_MAX_KEEPALIVE = int(os.getenv("GITHUB_MAX_KEEPALIVE", "20"))
+GITHUB_KEEPALIVE_EXPIRY = float(os.getenv("GITHUB_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 requiere el paquete opcional `h2` (pip install "httpx[http2]")
+GITHUB_HTTP2 = os.getenv("GITHUB_HTTP2", "false").lower() == "true"
+GITHUB_CACHE_MAX_ENTRIES = int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", "2000"))
+GITHUB_CACHE_MAX_BYTES = int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Paginación: páginas pedidas a la vez y tope opcional de páginas por listado
+# (0 = sin tope; si se corta un listado queda un warning en el log)
+GITHUB_PAGE_CONCURRENCY = int(os.getenv("GITHUB_PAGE_CONCURRENCY", "6"))
+GITHUB_MAX_PAGES = int(os.getenv("GITHUB_MAX_PAGES", "0"))
+GITHUB_PER_PAGE = 100
+
+LINK_REL = re.compile(r'<([^>]+)>;\s*rel="([^"]+)"')
+# Para las métricas: /repos/acme/api/pulls/12/files -> /repos/{repo}/pulls/{n}/files
+REPO_PREFIX = re.compile(r"^/repos/[^/]+/[^/]+")
+SHA_SEGMENT = re.compile(r"/[0-9a-f]{40}(?=/|$)")
+NUMBER_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# Cabeceras de la respuesta original que se conservan para reconstruirla en un 304
+CACHED_HEADERS = ("content-type", "etag", "last-modified", "link")
+
+_client = None
+_response_cache = LRUCache(GITHUB_CACHE_MAX_ENTRIES, max_size=GITHUB_CACHE_MAX_BYTES)
+_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "not_modified": 0,
+    "changed": 0
+}
+
+def _http2_enabled() -> bool:
+    if not GITHUB_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("⚠️ GITHUB_HTTP2 is enabled but the `h2` package is not installed, using HTTP/1.1.")
+        return False
+
+def open_github_client() -> httpx.AsyncClient:
+    """
+    Crea el cliente HTTP compartido para la API de GitHub (si no existe todavía) y lo devuelve.
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=GITHUB_API,
+            http2=_http2_enabled(),
+            timeout=httpx.Timeout(GITHUB_TIMEOUT, connect=GITHUB_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=GITHUB_MAX_CONNECTIONS,
+                max_keepalive_connections=GITHUB_MAX_KEEPALIVE,
+                keepalive_expiry=GITHUB_KEEPALIVE_EXPIRY
+            ),
+            headers={"X-GitHub-Api-Version": "2022-11-28"}
+        )
+    return _client
+
+async def close_github_client():
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_github_client() -> httpx.AsyncClient:
+    return open_github_client()
+
+def github_headers(token: str, accept: str = "application/vnd.github+json") -> dict:
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": accept
+    }
+
+def _endpoint_label(path: str) -> str:
+    path = REPO_PREFIX.sub("/repos/{repo}", path)
+    path = SHA_SEGMENT.sub("/{sha}", path)
+    return NUMBER_SEGMENT.sub("/{n}", path)
+
+async def _send(client: httpx.AsyncClient, request: httpx.Request) -> httpx.Response:
+    with track_upstream("github", _endpoint_label(request.url.path)) as outcome:
+        response = await client.send(request)
+        outcome["status"] = response.status_code
+    return response
+
+async def github_get(url: str, token: str, params: dict | None = None, cache: bool = False) -> httpx.Response:
+    """
+    GET autenticado con el token del usuario sobre el cliente compartido.
+
+    `url` puede ser una ruta relativa (`/repos/...`) o una URL absoluta de la API.
+
+    Con `cache=True` la respuesta se guarda junto con su ETag/Last-Modified por
+    (token, URL) y las siguientes peticiones se hacen condicionales: si GitHub
+    responde 304 (que no consume rate limit) se devuelve el cuerpo guardado como un 200.
+    """
+    client = get_github_client()
+    request = client.build_request("GET", url, params=params, headers=github_headers(token))
+    if not cache:
+        return await _send(client, request)
+
+    key = (hashlib.sha256(token.encode()).hexdigest(), str(request.url))
+    cached = _response_cache.get(key)
+    if cached is None:
+        _cache_stats["misses"] += 1
+    else:
+        _cache_stats["hits"] += 1
+        if cached["headers"].get("etag"):
+            request.headers["If-None-Match"] = cached["headers"]["etag"]
+        if cached["headers"].get("last-modified"):
+            request.headers["If-Modified-Since"] = cached["headers"]["last-modified"]
+
+    response = await _send(client, request)
+
+    if response.status_code == 304 and cached is not None:
+        _cache_stats["not_modified"] += 1
+        return httpx.Response(200, headers=cached["headers"], content=cached["content"], request=request)
+
+    if cached is not None:
+        _cache_stats["changed"] += 1
+
+    if response.status_code == 200 and ("etag" in response.headers or "last-modified" in response.headers):
+        content = response.content
+        _response_cache.set(
+            key,
+            {
+                "headers": {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers},
+                "content": content
+            },
+            size=len(content)
+        )
+    elif cached is not None:
+        _response_cache.pop(key)
+
+    return response
+
+def parse_link_header(value: str | None) -> dict:
+    """
+    Convierte la cabecera `Link` de GitHub en {rel: url}, p. ej. {"next": ..., "last": ...}.
+    """
+    if not value:
+        return {}
+    return {rel: url for url, rel in LINK_REL.findall(value)}
+
+def _page_number(url: str | None) -> int | None:
+    if not url:
+        return None
+    page = httpx.URL(url).params.get("page")
+    return int(page) if page and page.isdigit() else None
+
+def _page_items(response: httpx.Response, error_detail: str) -> list:
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=error_detail)
+    return response.json()
+
+async def github_iter_pages(
+    url: str,
+    token: str,
+    params: dict | None = None,
+    cache: bool = False,
+    max_pages: int | None = None,
+    error_detail: str = "GitHub API error"
+):
+    """
+    Iterador async de páginas (listas) de un listado paginado de GitHub.
+
+    Pide la primera página y, si la cabecera `Link` indica cuál es la última, pide el
+    resto en lotes concurrentes de GITHUB_PAGE_CONCURRENCY; si no, sigue `rel="next"`.
+    Las páginas se entregan siempre en orden. Con `max_pages` (o GITHUB_MAX_PAGES) se
+    para en esa página y se avisa en el log de que el listado quedó incompleto.
+    """
+    params = {"per_page": GITHUB_PER_PAGE, **(params or {})}
+    max_pages = max_pages or GITHUB_MAX_PAGES or None
+
+    response = await github_get(url, token, params=params, cache=cache)
+    yield _page_items(response, error_detail)
+
+    links = parse_link_header(response.headers.get("link"))
+    last_page = _page_number(links.get("last"))
+
+    if last_page is not None:
+        if max_pages is not None and last_page > max_pages:
+            logger.warning(
+                "⚠️ %s has %d pages, only the first %d are returned (GITHUB_MAX_PAGES).",
+                _endpoint_label(url), last_page, max_pages
+            )
+        pages = list(range(2, (last_page if max_pages is None else min(last_page, max_pages)) + 1))
+        for start in range(0, len(pages), GITHUB_PAGE_CONCURRENCY):
+            batch = pages[start:start + GITHUB_PAGE_CONCURRENCY]
+            responses = await asyncio.gather(
+                *(github_get(url, token, params={**params, "page": page}, cache=cache) for page in batch)
+            )
+            for page_response in responses:
+                yield _page_items(page_response, error_detail)
+        return
+
+    fetched = 1
+    next_url = links.get("next")
+    while next_url:
+        if max_pages is not None and fetched >= max_pages:
+            logger.warning(
+                "⚠️ %s has more than %d pages, the rest are not returned (GITHUB_MAX_PAGES).",
+                _endpoint_label(url), max_pages
+            )
+            return
+        response = await github_get(next_url, token, cache=cache)
+        yield _page_items(response, error_detail)
+        fetched += 1
+        next_url = parse_link_header(response.headers.get("link")).get("next")
+
+async def github_iter_items(url: str, token: str, **kwargs):
+    """
+    Igual que github_iter_pages pero entrega los elementos uno a uno.
+    """
+    async for page in github_iter_pages(url, token, **kwargs):
+        for item in page:
+            yield item
+
+async def github_get_all(url: str, token: str, **kwargs) -> list:
+    items = []
+    async for page in github_iter_pages(url, token, **kwargs):
+        items.extend(page)
+    return items
+
+def get_github_cache_stats() -> dict:
+    return {
+        **_cache_stats,
+        "entries": len(_response_cache),
+        "bytes": _response_cache.size
+    }
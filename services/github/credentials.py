@@ -0,0 +1,144 @@
+import os
+import config  # noqa: F401  (carga .env)
+from fastapi import HTTPException
+from database import get_db
+from utils.cache import LRUCache
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Las credenciales de GitHub de un empleado cambian muy rara vez: se cachean en memoria
+CREDENTIALS_CACHE_TTL = float(os.getenv("CREDENTIALS_CACHE_TTL", "300"))
+CREDENTIALS_CACHE_MAX_ENTRIES = int(os.getenv("CREDENTIALS_CACHE_MAX_ENTRIES", "1000"))
+
+EMPLOYEES_BY_USERNAME_SQL = 'SELECT id, github_token, github_username FROM "Employee" WHERE github_username = ANY(%s)'
+
+# user_id -> {"github_token", "github_username"}
+_by_user_id = LRUCache(CREDENTIALS_CACHE_MAX_ENTRIES, ttl=CREDENTIALS_CACHE_TTL)
+# github_username -> {"id", "github_token"}
+_by_username = LRUCache(CREDENTIALS_CACHE_MAX_ENTRIES, ttl=CREDENTIALS_CACHE_TTL)
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "invalidations": 0
+}
+
+def _remember(user_id, token: str, username: str):
+    if not token or not username:
+        return
+    _by_user_id.set(str(user_id), {"github_token": token, "github_username": username})
+    _by_username.set(username, {"id": user_id, "github_token": token})
+
+def get_user_github_credentials(user_id: int):
+    cached = _by_user_id.get(str(user_id))
+    if cached is not None:
+        _stats["hits"] += 1
+        return cached["github_token"], cached["github_username"]
+
+    _stats["misses"] += 1
+    try:
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT "github_token", "github_username" FROM "Employee" WHERE "id" = %s', (user_id,))
+            row = cur.fetchone()
+
+        if not row:
+            logger.warning("❌ Credenciales no encontradas para el usuario %s", user_id)
+            raise HTTPException(status_code=404, detail="GitHub credentials not found")
+
+        token = row.get("github_token")
+        username = row.get("github_username")
+
+        if not token:
+            raise HTTPException(status_code=404, detail="GitHub token is empty")
+        if not username:
+            raise HTTPException(status_code=404, detail="GitHub username is missing")
+
+        _remember(user_id, token, username)
+        return token, username
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("❌ DB error: %s", e)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+def get_employee_by_username(cur, username: str) -> dict | None:
+    """
+    Devuelve {"id", "github_token"} del empleado con ese usuario de GitHub, usando la
+    caché y, si no está, el cursor recibido.
+    """
+    if not username:
+        return None
+
+    cached = _by_username.get(username)
+    if cached is not None:
+        _stats["hits"] += 1
+        return cached
+
+    _stats["misses"] += 1
+    cur.execute(
+        'SELECT id, github_token FROM "Employee" WHERE github_username = %s',
+        (username,)
+    )
+    row = cur.fetchone()
+    if not row:
+        return None
+
+    employee = {"id": row["id"], "github_token": row["github_token"]}
+    _remember(employee["id"], employee["github_token"], username)
+    return employee
+
+def get_employees_by_usernames(cur, usernames) -> dict:
+    """
+    Como `get_employee_by_username` para varios usuarios a la vez: lo que no está en la
+    caché se resuelve con una sola consulta. Devuelve {github_username: {"id", "github_token"}}.
+    """
+    employees = {}
+    missing = []
+    for username in set(filter(None, usernames)):
+        cached = _by_username.get(username)
+        if cached is not None:
+            _stats["hits"] += 1
+            employees[username] = cached
+        else:
+            _stats["misses"] += 1
+            missing.append(username)
+
+    if missing:
+        cur.execute(EMPLOYEES_BY_USERNAME_SQL, (missing,))
+        for row in cur.fetchall():
+            employee = {"id": row["id"], "github_token": row["github_token"]}
+            _remember(employee["id"], employee["github_token"], row["github_username"])
+            employees[row["github_username"]] = employee
+
+    return employees
+
+def invalidate_credentials(user_id=None, username: str | None = None):
+    """
+    Olvida las credenciales cacheadas de un empleado (por id y/o usuario de GitHub).
+    Sin argumentos vacía la caché entera. Llamar siempre que se actualice "Employee".
+    """
+    _stats["invalidations"] += 1
+
+    if user_id is None and username is None:
+        _by_user_id.clear()
+        _by_username.clear()
+        return
+
+    if user_id is not None:
+        cached = _by_user_id.pop(str(user_id))
+        if cached is not None:
+            _by_username.pop(cached["github_username"])
+
+    if username is not None:
+        cached = _by_username.pop(username)
+        if cached is not None:
+            _by_user_id.pop(str(cached["id"]))
+
+def get_credentials_cache_stats() -> dict:
+    return {
+        **_stats,
+        "entries": len(_by_user_id),
+        "ttl_seconds": CREDENTIALS_CACHE_TTL
+    }
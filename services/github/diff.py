@@ -0,0 +1,90 @@
+import hashlib
+import re
+
+# Cabecera de hunk: "@@ -10,7 +10,8 @@ contexto" o sin conteos ("@@ -1 +1 @@") cuando el hunk tiene una sola línea
+HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+class DiffLine:
+    """
+    Línea de un diff ya numerada. Usa __slots__ para no pagar un dict por línea en patches grandes.
+
+    Admite acceso por clave (`l["line"]`) como los dicts que devolvía el parser anterior.
+    """
+    __slots__ = ("line", "type", "code")
+
+    def __init__(self, line: int, type: str, code: str):
+        self.line = line
+        self.type = type
+        self.code = code
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if isinstance(other, DiffLine):
+            return (self.line, self.type, self.code) == (other.line, other.type, other.code)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"DiffLine({self.line!r}, {self.type!r}, {self.code!r})"
+
+    def to_dict(self) -> dict:
+        return {"line": self.line, "type": self.type, "code": self.code}
+
+def iter_diff_lines(diff_text: str):
+    """
+    Recorre un patch unificado línea a línea sin materializar la lista de líneas.
+
+    Las líneas de borrado se numeran con la línea antigua y las de inserción/contexto
+    con la nueva. Todo lo que aparece antes del primer hunk (cabeceras de archivo,
+    index...) y los marcadores "\\ No newline at end of file" se ignoran.
+    """
+    current_old = None
+    current_new = None
+    start = 0
+    length = len(diff_text)
+
+    while start < length:
+        end = diff_text.find("\n", start)
+        if end == -1:
+            end = length
+        line = diff_text[start:end]
+        start = end + 1
+
+        if not line:
+            continue
+        if line[-1] == "\r":
+            line = line[:-1]
+            if not line:
+                continue
+
+        marker = line[0]
+        if marker == "@":
+            header_match = HUNK_HEADER.match(line)
+            if header_match:
+                current_old = int(header_match.group(1))
+                current_new = int(header_match.group(2))
+                continue
+
+        if current_new is None:
+            continue
+
+        if marker == "-":
+            yield DiffLine(current_old, "delete", line[1:].strip())
+            current_old += 1
+        elif marker == "+":
+            yield DiffLine(current_new, "insert", line[1:].strip())
+            current_new += 1
+        elif marker == " ":
+            yield DiffLine(current_new, "normal", line[1:].strip())
+            current_old += 1
+            current_new += 1
+
+def parse_diff_to_lines(diff_text: str) -> list[DiffLine]:
+    return list(iter_diff_lines(diff_text))
+
+def patch_fingerprint(patch: str) -> str:
+    """
+    Huella del patch de un archivo: si no cambia entre dos pushes del PR, su revisión tampoco.
+    """
+    return hashlib.sha256(patch.encode("utf-8")).hexdigest()
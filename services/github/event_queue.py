@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import config
+from database import DB_POOL_MAX_SIZE, get_db, get_db_async
+from services.github.github_service import process_github_event
+from utils.log import get_logger
+from utils.metrics import WEBHOOK_EVENTS, WEBHOOK_EVENT_DURATION, WEBHOOK_QUEUE_DEPTH
+
+logger = get_logger(__name__)
+
+# 0 desactiva los workers; la cola se vacía entonces con drain_events. Por defecto 0 en
+# Vercel: los workers abrirían el pool de la BD durante el arranque en frío y morirían entre invocaciones
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "0" if config.IS_SERVERLESS else "2"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+WEBHOOK_RETRY_BASE_DELAY = float(os.getenv("WEBHOOK_RETRY_BASE_DELAY", "30"))
+WEBHOOK_RETRY_MAX_DELAY = float(os.getenv("WEBHOOK_RETRY_MAX_DELAY", "1800"))
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "5"))
+# Eventos que siguen en `processing` más de estos segundos se consideran abandonados y se reintentan
+# (o se marcan `failed` si ya agotaron sus intentos). Mientras un evento se procesa, su
+# `started_at` se renueva cada WEBHOOK_HEARTBEAT_INTERVAL, así que un PR largo no caduca
+WEBHOOK_STALE_AFTER = float(os.getenv("WEBHOOK_STALE_AFTER", "900"))
+WEBHOOK_HEARTBEAT_INTERVAL = float(os.getenv("WEBHOOK_HEARTBEAT_INTERVAL", str(WEBHOOK_STALE_AFTER / 3)))
+# Tiempo máximo de un vaciado de la cola (drain_events): por debajo del límite de una función de Vercel
+WEBHOOK_DRAIN_MAX_SECONDS = float(os.getenv("WEBHOOK_DRAIN_MAX_SECONDS", "50"))
+# Secreto que Vercel Cron envía como "Authorization: Bearer ..." a /github/webhook/drain;
+# también protege /github/webhook/stats y /github/cache/stats
+CRON_SECRET = os.getenv("CRON_SECRET")
+
+# Se ejecutan en cada intento de reclamar un evento; scripts/check_indexes.py comprueba que usan índice.
+# Abandonados (el proceso murió a mitad) que ya no tienen intentos: no se reintentan más
+ABANDON_EVENTS_SQL = '''
+    UPDATE "Github_Event"
+    SET status = 'failed', last_error = %s
+    WHERE status = 'processing' AND started_at < %s AND COALESCE(attempts, 0) >= %s
+'''
+CLAIM_EVENT_SQL = '''
+    UPDATE "Github_Event" e
+    SET status = 'processing',
+        attempts = COALESCE(e.attempts, 0) + 1,
+        started_at = %s
+    WHERE e.id = (
+        SELECT id FROM "Github_Event"
+        WHERE (status = 'pending' AND (next_attempt_at IS NULL OR next_attempt_at <= %s))
+           OR (status = 'processing' AND started_at < %s AND COALESCE(attempts, 0) < %s)
+        ORDER BY id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING e.id, e.event_type, e.payload, e.attempts, e.created_at
+'''
+
+_workers = []
+_wakeup = None
+_latencies = deque(maxlen=500)
+_stats = {
+    "enqueued": 0,
+    "duplicates": 0,
+    "processed": 0,
+    "retried": 0,
+    "failed": 0
+}
+
+def enqueue_github_event(event_type: str, payload: dict, delivery_id: str | None = None) -> int | None:
+    """
+    Guarda el evento en `Github_Event` como `pending` y despierta a los workers.
+
+    `delivery_id` es la cabecera X-GitHub-Delivery: las reentregas de GitHub repiten el
+    mismo id, así que si ya existe no se inserta nada y se devuelve None.
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            INSERT INTO "Github_Event" (event_type, payload, status, created_at, delivery_id)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (delivery_id) DO NOTHING
+            RETURNING id
+            ''',
+            (event_type, json.dumps(payload), "pending", datetime.utcnow(), delivery_id)
+        )
+        result = cur.fetchone()
+        conn.commit()
+
+    if result is None:
+        _stats["duplicates"] += 1
+        logger.info("🔁 Duplicate webhook delivery %s ignored.", delivery_id)
+        return None
+
+    _stats["enqueued"] += 1
+    if _wakeup is not None:
+        _wakeup.set()
+    return result["id"]
+
+def _claim_next_event():
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=WEBHOOK_STALE_AFTER)
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            ABANDON_EVENTS_SQL,
+            ("Abandoned while processing, no attempts left", stale_before, WEBHOOK_MAX_ATTEMPTS)
+        )
+        _stats["failed"] += cur.rowcount
+        cur.execute(CLAIM_EVENT_SQL, (now, now, stale_before, WEBHOOK_MAX_ATTEMPTS))
+        event = cur.fetchone()
+        conn.commit()
+    return event
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(WEBHOOK_RETRY_BASE_DELAY * (2 ** (attempts - 1)), WEBHOOK_RETRY_MAX_DELAY)
+    return random.uniform(delay / 2, delay)
+
+def _mark_done(event_id: int):
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''UPDATE "Github_Event" SET status = %s, processed_at = %s, last_error = NULL WHERE id = %s''',
+            ("done", datetime.utcnow(), event_id)
+        )
+        conn.commit()
+
+def _mark_failed(event_id: int, attempts: int, error: Exception):
+    if attempts >= WEBHOOK_MAX_ATTEMPTS:
+        status, next_attempt_at = "failed", None
+        _stats["failed"] += 1
+    else:
+        status = "pending"
+        next_attempt_at = datetime.utcnow() + timedelta(seconds=_retry_delay(attempts))
+        _stats["retried"] += 1
+
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            UPDATE "Github_Event"
+            SET status = %s, next_attempt_at = %s, last_error = %s
+            WHERE id = %s
+            ''',
+            (status, next_attempt_at, str(error)[:1000], event_id)
+        )
+        conn.commit()
+
+async def _heartbeat(event_id: int):
+    # Renueva `started_at` para que otro worker no dé el evento por abandonado
+    while True:
+        await asyncio.sleep(WEBHOOK_HEARTBEAT_INTERVAL)
+        try:
+            async with get_db_async() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    '''UPDATE "Github_Event" SET started_at = %s WHERE id = %s AND status = 'processing' ''',
+                    (datetime.utcnow(), event_id)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.warning("⚠️ Could not refresh GitHub event %s: %s", event_id, e)
+
+async def _process_event(event: dict):
+    event_id = event["id"]
+    attempts = event["attempts"]
+    payload = event["payload"]
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+
+    started = time.perf_counter()
+    outcome = "done"
+    heartbeat = asyncio.create_task(_heartbeat(event_id))
+    try:
+        async with get_db_async() as conn:
+            await process_github_event(event["event_type"], payload, conn)
+        await asyncio.to_thread(_mark_done, event_id)
+        _stats["processed"] += 1
+    except Exception as e:
+        outcome = "failed"
+        logger.exception("❌ Error processing GitHub event %s (attempt %s/%s): %s", event_id, attempts, WEBHOOK_MAX_ATTEMPTS, e)
+        await asyncio.to_thread(_mark_failed, event_id, attempts, e)
+    finally:
+        heartbeat.cancel()
+        elapsed = time.perf_counter() - started
+        _latencies.append(elapsed)
+        WEBHOOK_EVENT_DURATION.observe(elapsed, event_type=event["event_type"])
+        WEBHOOK_EVENTS.inc(event_type=event["event_type"], outcome=outcome)
+
+async def _worker_loop(worker_id: int):
+    while True:
+        try:
+            event = await asyncio.to_thread(_claim_next_event)
+        except Exception as e:
+            logger.error("❌ Worker %s could not claim an event: %s", worker_id, e)
+            event = None
+
+        if event is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=WEBHOOK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await _process_event(event)
+
+async def drain_events(max_events: int | None = None, max_seconds: float | None = WEBHOOK_DRAIN_MAX_SECONDS) -> int:
+    """
+    Procesa eventos pendientes uno a uno hasta vaciar la cola o llegar a `max_events` o
+    `max_seconds` (se comprueba entre eventos). Es la alternativa a los workers donde no
+    hay procesos de fondo: un cron o `python -m services.github.event_queue drain`.
+    Devuelve cuántos eventos se procesaron.
+    """
+    started = time.monotonic()
+    processed = 0
+    while max_events is None or processed < max_events:
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            break
+        event = await asyncio.to_thread(_claim_next_event)
+        if event is None:
+            break
+        await _process_event(event)
+        processed += 1
+    return processed
+
+def start_workers():
+    global _wakeup
+
+    if WEBHOOK_WORKERS <= 0 or _workers:
+        return
+
+    # Cada worker retiene una conexión del pool mientras espera a GitHub y al LLM. Si
+    # ocupan todas, cada petición espera hasta DB_POOL_TIMEOUT y acaba fallando
+    workers = WEBHOOK_WORKERS
+    if workers >= DB_POOL_MAX_SIZE:
+        workers = max(DB_POOL_MAX_SIZE - 1, 1)
+        logger.warning(
+            "⚠️ WEBHOOK_WORKERS=%d needs DB_POOL_MAX_SIZE > %d, starting %d worker(s).",
+            WEBHOOK_WORKERS, WEBHOOK_WORKERS, workers
+        )
+
+    _wakeup = asyncio.Event()
+    for worker_id in range(workers):
+        _workers.append(asyncio.create_task(_worker_loop(worker_id)))
+    logger.info("✅ Started %d webhook worker(s).", workers)
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+def get_queue_depth() -> dict:
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            '''
+            SELECT status, COUNT(*) AS count
+            FROM "Github_Event"
+            WHERE status IN ('pending', 'processing', 'failed')
+            GROUP BY status
+            '''
+        )
+        rows = cur.fetchall()
+
+    depth = {"pending": 0, "processing": 0, "failed": 0}
+    for row in rows:
+        depth[row["status"]] = row["count"]
+    return depth
+
+WEBHOOK_QUEUE_DEPTH.set_function(
+    lambda: {(status,): count for status, count in get_queue_depth().items()}
+)
+
+def get_queue_stats() -> dict:
+    latencies = sorted(_latencies)
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+    return {
+        "workers": len(_workers),
+        "depth": get_queue_depth(),
+        **_stats,
+        "latency_seconds": {
+            "samples": len(latencies),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "max": round(latencies[-1], 3) if latencies else None
+        }
+    }
+
+if __name__ == "__main__":
+    # python -m services.github.event_queue drain [max_events]
+    if len(sys.argv) > 1 and sys.argv[1] == "drain":
+        from services.github.client import close_github_client
+
+        async def _drain():
+            try:
+                return await drain_events(int(sys.argv[2]) if len(sys.argv) > 2 else None, max_seconds=None)
+            finally:
+                gemini = sys.modules.get("services.llm.gemini")
+                if gemini is not None:
+                    await gemini.close_llm_client()
+                await close_github_client()
+
+        print(f"✅ Queue drained: {asyncio.run(_drain())} events processed.")
+    else:
+        print("Usage: python -m services.github.event_queue drain [max_events]")
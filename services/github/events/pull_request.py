@@ -1,51 +1,23 @@
 from datetime import datetime
 import json
-import traceback
-import requests
 import re
+from services.github.client import github_get_all
+from services.github.credentials import get_employee_by_username
+from services.github.mirror import record_pull_request_files
+from services.github.diff import DiffLine, parse_diff_to_lines, patch_fingerprint
+from services.github.events.review import review_files, cached_review
 from services.llm.gemini import call_llm
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
-GEMINI_KEY_1 = os.getenv("GEMINI_API_KEY_1")
-GEMINI_KEY_2 = os.getenv("GEMINI_API_KEY_2")
-GITHUB_API = "https://api.github.com"
-
-def parse_diff_to_lines(diff_text: str):
-    lines = diff_text.splitlines()
-    result = []
-
-    current_old = None
-    current_new = None
-
-    for line in lines:
-        header_match = re.match(r"@@ -(\d+),?\d* \+(\d+),?\d* @@", line)
-        if header_match:
-            current_old = int(header_match.group(1))
-            current_new = int(header_match.group(2))
-            continue
-
-        if line.startswith("-"):
-            result.append({"line": current_old, "type": "delete", "code": line[1:].strip()})
-            current_old += 1
-        elif line.startswith("+"):
-            result.append({"line": current_new, "type": "insert", "code": line[1:].strip()})
-            current_new += 1
-        elif line.startswith(" "):
-            result.append({"line": current_new, "type": "normal", "code": line[1:].strip()})
-            current_old += 1
-            current_new += 1
-
-    return result
+from utils.log import get_logger
+
+logger = get_logger(__name__)
 
 def clean_llm_response(raw: str) -> str:
     match = re.search(r"```json\s*(.*?)\s*```", raw, re.DOTALL)
     return match.group(1).strip() if match else raw.strip()
 
-def generate_prompt(structured_lines: list[dict]) -> str:
+def generate_prompt(structured_lines: list[DiffLine]) -> str:
     lines_formatted = "\n".join(
-        f'Line {l["line"]} ({l["type"]}): {l["code"]}' for l in structured_lines
+        f'Line {l.line} ({l.type}): {l.code}' for l in structured_lines
     )
 
     return f"""
@@ -118,24 +90,53 @@ def generate_summary_prompt(repo_name: str, ref_id: str, feedback_by_file: list[
         }}
     """.strip()
 
-def fetch_pull_request_files(repo: str, pr_number: int, token: str) -> list[dict]:
-    url = f"{GITHUB_API}/repos/{repo}/pulls/{pr_number}/files"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
+async def fetch_pull_request_files(repo: str, pr_number: int, token: str) -> list[dict]:
+    return await github_get_all(
+        f"/repos/{repo}/pulls/{pr_number}/files",
+        token,
+        error_detail="Error fetching PR files"
+    )
+
+async def review_pull_request_file(file: dict) -> dict | None:
+    file_path = file.get("filename")
+    patch = file.get("patch")
+    if not patch:
+        return None
+
+    structured_lines = parse_diff_to_lines(patch)
+    if not structured_lines:
+        return None
+
+    async def run_review():
+        prompt = generate_prompt(structured_lines)
+        llm_response = None
+        try:
+            llm_response = await call_llm(prompt)
+            cleaned = clean_llm_response(llm_response)
+            return json.loads(cleaned)
+        except Exception as e:
+            logger.error("❌ Error en feedback para %s: %s", file_path, e)
+            logger.debug("🔍 Respuesta cruda: %r", llm_response)
+            return None
+
+    comments = await cached_review(structured_lines, run_review)
+
+    if not comments:
+        return None
+
+    return {
+        "filePath": file_path,
+        "comments": comments
     }
-    res = requests.get(url, headers=headers)
-    res.raise_for_status()
-    return res.json()
 
-def process_pull_request_event(payload: dict, conn):
+async def process_pull_request_event(payload: dict, conn):
     cur = None
     try:
-        print("📥 Procesando evento de Pull Request...")
+        logger.debug("📥 Procesando evento de Pull Request...")
 
         action = payload.get("action")
         if action not in ("opened", "synchronize", "reopened"):
-            print(f"🔄 Acción '{action}' ignorada.")
+            logger.debug("🔄 Acción '%s' ignorada.", action)
             return
 
         pull_request = payload.get("pull_request", {})
@@ -146,121 +147,133 @@ def process_pull_request_event(payload: dict, conn):
         author_username = pull_request.get("user", {}).get("login")
 
         cur = conn.cursor()
-        cur.execute(
-            'SELECT id, github_token FROM "Employee" WHERE github_username = %s',
-            (author_username,)
-        )
-        result = cur.fetchone()
-        print("🔍 Resultado crudo de empleado:", result)
-
+        result = get_employee_by_username(cur, author_username)
 
         if not result:
-            print("❌ Empleado no encontrado.")
+            logger.info("❌ Empleado no encontrado: %s", author_username)
             return
 
         employee_id = result["id"]
         github_token = result["github_token"]
 
+        head_sha = pull_request.get("head", {}).get("sha")
+
+        # Upsert: reabrir o sincronizar un PR ya registrado lo vuelve a poner en análisis,
+        # salvo que ya esté analizado en este mismo head (reentrega, reopen sin cambios).
+        # RETURNING trae el feedback y las huellas del análisis anterior.
         cur.execute(
             '''
-            SELECT 1 FROM "PullRequest_Feedback"
-            WHERE github_repo_id = %s AND pr_number = %s
+            INSERT INTO "PullRequest_Feedback"
+            (github_repo_id, pr_number, retro, created_at, employee_id, github_username, head_sha)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (github_repo_id, pr_number) DO UPDATE
+            SET retro = EXCLUDED.retro,
+                created_at = EXCLUDED.created_at,
+                employee_id = EXCLUDED.employee_id,
+                github_username = EXCLUDED.github_username
+            WHERE "PullRequest_Feedback".head_sha IS DISTINCT FROM EXCLUDED.head_sha
+               OR "PullRequest_Feedback".retro NOT IN ('analyzed', 'not_analyzed')
+            RETURNING feedback, file_fingerprints, summary
             ''',
-            (repo_id, pr_number)
-        )
-        exists = cur.fetchone() is not None
-
-        if exists:
-            cur.execute(
-                '''
-                UPDATE "PullRequest_Feedback"
-                SET retro = %s,
-                    created_at = %s,
-                    employee_id = %s,
-                    github_username = %s
-                WHERE github_repo_id = %s AND pr_number = %s
-                ''',
-                (
-                    "analyzing",
-                    datetime.utcnow(),
-                    employee_id,
-                    author_username,
-                    repo_id,
-                    pr_number
-                )
-            )
-        else:
-            cur.execute(
-                '''
-                INSERT INTO "PullRequest_Feedback"
-                (github_repo_id, pr_number, retro, created_at, employee_id, github_username)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ''',
-                (
-                    repo_id,
-                    pr_number,
-                    "analyzing",
-                    datetime.utcnow(),
-                    employee_id,
-                    author_username
-                )
+            (
+                repo_id,
+                pr_number,
+                "analyzing",
+                datetime.utcnow(),
+                employee_id,
+                author_username,
+                head_sha
             )
+        )
+        previous = cur.fetchone()
         conn.commit()
 
-        feedback_result = []
-        try:
-            pr_files = fetch_pull_request_files(repo_full_name, pr_number, github_token)
-        except Exception as e:
-            print("❌ Error obteniendo archivos del PR:", e)
+        if previous is None:
+            logger.info("⏭️ PR #%s ya analizado en %s.", pr_number, head_sha)
             return
 
-        for file in pr_files:
-            file_path = file.get("filename")
-            patch = file.get("patch")
-            if not patch:
-                continue
+        previous_feedback = {
+            entry["filePath"]: entry
+            for entry in previous["feedback"] or []
+            if isinstance(entry, dict) and entry.get("filePath")
+        }
+        previous_fingerprints = previous["file_fingerprints"] or {}
+
+        try:
+            pr_files = await fetch_pull_request_files(repo_full_name, pr_number, github_token)
+        except Exception as e:
+            logger.error("❌ Error obteniendo archivos del PR #%s: %s", pr_number, e)
+            raise
 
-            structured_lines = parse_diff_to_lines(patch)
-            if not structured_lines:
-                continue
+        # Commit inmediato: no se puede dejar la fila de "Github_PullRequest" bloqueada mientras se
+        # espera al LLM, otro worker podría estar actualizando el mismo PR (labeled, closed...)
+        record_pull_request_files(cur, repo_id, pr_number, pr_files)
+        conn.commit()
 
-            prompt = generate_prompt(structured_lines)
-            try:
-                llm_response = call_llm(prompt, GEMINI_KEY_1)
-                cleaned = clean_llm_response(llm_response)
-                comments = json.loads(cleaned)
-            except Exception as e:
-                print(f"❌ Error en feedback para {file_path}:", e)
-                print("🔍 Respuesta cruda:", repr(llm_response))
-                comments = []
+        # Solo se revisan los archivos cuyo patch cambió desde el análisis anterior;
+        # el resto conserva sus comentarios
+        fingerprints = {
+            f["filename"]: patch_fingerprint(f["patch"])
+            for f in pr_files
+            if f.get("filename") and f.get("patch")
+        }
+        changed_files = [
+            f for f in pr_files
+            if f.get("filename") not in fingerprints
+            or fingerprints[f["filename"]] != previous_fingerprints.get(f["filename"])
+        ]
+        reviewed = {
+            entry["filePath"]: entry
+            for entry in await review_files(changed_files, review_pull_request_file)
+        }
+        changed_names = {f.get("filename") for f in changed_files}
 
-            if comments:
-                feedback_result.append({
-                    "filePath": file_path,
-                    "comments": comments
-                })
+        feedback_result = []
+        for f in pr_files:
+            name = f.get("filename")
+            entry = reviewed.get(name) if name in changed_names else previous_feedback.get(name)
+            if entry:
+                feedback_result.append(entry)
+
+        # Solo se guarda la huella de los archivos con feedback: si la revisión de uno falló,
+        # el próximo synchronize lo vuelve a revisar aunque su patch no haya cambiado
+        reviewed_names = {entry["filePath"] for entry in feedback_result}
+        fingerprints = {name: value for name, value in fingerprints.items() if name in reviewed_names}
+
+        logger.info(
+            "🔁 PR #%s: %d/%d archivos revisados, %d conservados.",
+            pr_number, len(changed_files), len(pr_files), len(pr_files) - len(changed_files)
+        )
 
         cur.execute(
             '''
             UPDATE "PullRequest_Feedback"
             SET retro = %s,
                 feedback = %s,
-                analyzed_at = %s
+                analyzed_at = %s,
+                head_sha = %s,
+                file_fingerprints = %s
             WHERE github_repo_id = %s AND pr_number = %s
             ''',
             (
                 "analyzed" if feedback_result else "not_analyzed",
                 json.dumps(feedback_result),
                 datetime.utcnow(),
+                head_sha,
+                json.dumps(fingerprints),
                 repo_id,
                 pr_number
             )
         )
+        conn.commit()
 
-        if feedback_result:
+        # El resumen se regenera solo si el feedback cambió (o si aún no había resumen)
+        feedback_changed = feedback_result != list(previous_feedback.values())
+        if feedback_result and (feedback_changed or not previous["summary"]):
             summary_prompt = generate_summary_prompt(repo_full_name, f"PR-{pr_number}", feedback_result, len(feedback_result))
+            summary_raw = None
             try:
-                summary_raw = call_llm(summary_prompt, GEMINI_KEY_2)
+                summary_raw = await call_llm(summary_prompt)
                 cleaned_summary = clean_llm_response(summary_raw)
                 summary_data = json.loads(cleaned_summary)
 
@@ -281,18 +294,18 @@ def process_pull_request_event(payload: dict, conn):
                     )
                 )
             except Exception as e:
-                print("❌ Error en resumen del PR:", e)
-                print("🔍 Resumen crudo:", repr(summary_raw))
+                logger.error("❌ Error en resumen del PR #%s: %s", pr_number, e)
+                logger.debug("🔍 Resumen crudo: %r", summary_raw)
 
         conn.commit()
 
     except Exception as e:
-        print("❌ Error general en análisis de PR:")
-        traceback.print_exc()
+        logger.exception("❌ Error general en análisis de PR: %s", e)
         try:
             conn.rollback()
         except Exception as rollback_error:
-            print("⚠️ Error al hacer rollback:", rollback_error)
+            logger.warning("⚠️ Error al hacer rollback: %s", rollback_error)
+        raise
     finally:
         if cur:
             cur.close()
@@ -1,19 +1,21 @@
 from datetime import datetime
 import json
-from dotenv import load_dotenv
-import requests
+import logging
+from services.github.client import github_get
+from psycopg2.extras import execute_batch, execute_values
+from services.github.credentials import get_employees_by_usernames
+from services.github.mirror import record_commit_stats
+from services.github.diff import DiffLine, parse_diff_to_lines
+from services.github.events.review import review_files, cached_review
 from services.llm.gemini import call_llm
+from utils.log import get_logger, log_sampled
 import re
-import os
 
-load_dotenv()
-GEMINI_KEY_1 = os.getenv("GEMINI_API_KEY_1")
-GEMINI_KEY_2 = os.getenv("GEMINI_API_KEY_2")
-GITHUB_API = "https://api.github.com"
+logger = get_logger(__name__)
 
-def generate_prompt(structured_lines: list[dict]) -> str:
+def generate_prompt(structured_lines: list[DiffLine]) -> str:
     lines_formatted = "\n".join(
-        f'Line {l["line"]} ({l["type"]}): {l["code"]}' for l in structured_lines
+        f'Line {l.line} ({l.type}): {l.code}' for l in structured_lines
     )
 
     return f"""
@@ -86,47 +88,6 @@ def generate_summary_prompt(repo_name: str, sha: str, feedback_by_file: list[dic
         }}
         """.strip()
 
-def parse_diff_to_lines(diff_text: str):
-    lines = diff_text.splitlines()
-    result = []
-
-    current_old = None
-    current_new = None
-
-    for line in lines:
-        header_match = re.match(r"@@ -(\d+),?\d* \+(\d+),?\d* @@", line)
-        if header_match:
-            current_old = int(header_match.group(1))
-            current_new = int(header_match.group(2))
-            continue
-
-        if line.startswith("-"):
-            result.append({
-                "line": current_old,
-                "type": "delete",
-                "code": line[1:].strip()
-            })
-            current_old += 1
-        elif line.startswith("+"):
-            result.append({
-                "line": current_new,
-                "type": "insert",
-                "code": line[1:].strip()
-            })
-            current_new += 1
-        elif line.startswith(" "):
-            result.append({
-                "line": current_new,
-                "type": "normal",
-                "code": line[1:].strip()
-            })
-            current_old += 1
-            current_new += 1
-        else:
-            continue  # Skips index/hash/file headers
-
-    return result
-
 def clean_llm_response(raw: str) -> str:
     """
     Extrae el contenido JSON de una respuesta en bloque de código markdown.
@@ -134,155 +95,178 @@ def clean_llm_response(raw: str) -> str:
     match = re.search(r"```json\s*(.*?)\s*```", raw, re.DOTALL)
     return match.group(1).strip() if match else raw.strip()
 
-def fetch_commit_data(sha: str, repo: str, token: str) -> dict:
-    url = f"{GITHUB_API}/repos/{repo}/commits/{sha}"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
-    res = requests.get(url, headers=headers)
+async def fetch_commit_data(sha: str, repo: str, token: str) -> dict:
+    res = await github_get(f"/repos/{repo}/commits/{sha}", token)
     res.raise_for_status()
     return res.json()
 
-def process_push_event(payload: dict, conn):
+async def review_commit_file(file: dict) -> dict | None:
+    file_path = file.get("filename")
+    patch = file.get("patch")
+
+    if not patch:
+        return None
+
+    structured_lines = parse_diff_to_lines(patch)
+    if not structured_lines:
+        return None
+
+    async def run_review():
+        prompt = generate_prompt(structured_lines)
+        llm_response = None
+        try:
+            llm_response = await call_llm(prompt)
+            cleaned = clean_llm_response(llm_response)
+            return json.loads(cleaned)
+        except Exception as e:
+            logger.error("❌ Error generating or parsing feedback for %s: %s", file_path, e)
+            logger.debug("🔍 Raw response from Gemini: %r", llm_response)
+            return None
+
+    comments = await cached_review(structured_lines, run_review)
+
+    if not comments:
+        return None
+
+    return {
+        "filePath": file_path,
+        "comments": comments
+    }
+
+async def process_push_event(payload: dict, conn):
     cur = None
     try:
         commits = payload.get("commits", [])
         repo = payload.get("repository", {}).get("full_name", "")
+        repo_id = payload.get("repository", {}).get("id")
         if not commits:
             return
 
         cur = conn.cursor()
 
-        for commit in commits:
-            sha = commit.get("id")
+        # Todos los autores del push en una sola consulta (o desde la caché)
+        employees = get_employees_by_usernames(
+            cur, [commit.get("author", {}).get("username") for commit in commits]
+        )
 
+        to_analyze = []
+        for commit in commits:
             author_username = commit.get("author", {}).get("username")
-            employee_id = None
-            github_token = None
-
-            if author_username:
-                cur.execute(
-                    'SELECT id, github_token FROM "Employee" WHERE github_username = %s',
-                    (author_username,)
-                )
-                result = cur.fetchone()
-                if result:
-                    employee_id = result[0] if isinstance(result, tuple) else result.get("id")
-                    github_token = result[1] if isinstance(result, tuple) else result.get("github_token")
-
-            if not github_token:
+            employee = employees.get(author_username)
+            if not employee or not employee["github_token"]:
                 continue  # No token, no análisis
+            to_analyze.append((commit.get("id"), author_username, employee))
 
-            # Verificar si ya existe
-            cur.execute('SELECT 1 FROM "Commit_Feedback" WHERE sha = %s', (sha,))
-            already_exists = cur.fetchone() is not None
+        if not to_analyze:
+            return
 
-            if not already_exists:
-                # Insertar registro inicial
-                repo_id = payload.get("repository", {}).get("id")
+        # Registro inicial de todos los commits; ON CONFLICT evita duplicados si llegan
+        # dos entregas del mismo push a la vez
+        now = datetime.utcnow()
+        execute_values(
+            cur,
+            '''
+            INSERT INTO "Commit_Feedback" (sha, status, created_at, employee_id, github_username, github_repo_id)
+            VALUES %s
+            ON CONFLICT (sha) DO NOTHING
+            ''',
+            [(sha, "analyzing", now, employee["id"], author_username, repo_id) for sha, author_username, employee in to_analyze]
+        )
+
+        # Commits ya analizados (reentregas, el mismo commit subido a otra rama...): no se
+        # vuelven a pedir a GitHub ni al LLM. Los que quedaron en "analyzing" sí se reintentan.
+        cur.execute(
+            '''
+            SELECT sha FROM "Commit_Feedback"
+            WHERE sha = ANY(%s) AND status IN ('analyzed', 'not_analyzed')
+            ''',
+            ([sha for sha, _, _ in to_analyze],)
+        )
+        done = {row["sha"] for row in cur.fetchall()}
+        conn.commit()
 
-                cur.execute(
-                    '''
-                    INSERT INTO "Commit_Feedback" (sha, status, created_at, employee_id, github_username, github_repo_id)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    ''',
-                    (sha, "analyzing", datetime.utcnow(), employee_id, author_username, repo_id)    
-                )
+        if done:
+            logger.info("⏭️ %d commit(s) already analyzed, skipping.", len(done))
+        to_analyze = [item for item in to_analyze if item[0] not in done]
 
+        commits_data = []
+        feedback_rows = []
+        summary_rows = []
 
+        for sha, _, employee in to_analyze:
             # Obtener datos del commit
             try:
-                commit_data = fetch_commit_data(sha, repo, github_token)
+                commit_data = await fetch_commit_data(sha, repo, employee["github_token"])
             except Exception as e:
-                print(f"❌ Error fetching commit data for {sha}:", e)
-                continue
-
-            feedback_result = []
-
-            for file in commit_data.get("files", []):
-                file_path = file.get("filename")
-                patch = file.get("patch")
-
-                if not patch:
-                    continue
-
-                structured_lines = parse_diff_to_lines(patch)
-                if not structured_lines:
-                    continue
-
-                prompt = generate_prompt(structured_lines)
-
-                try:
-                    llm_response = call_llm(prompt, GEMINI_KEY_1)
-                    cleaned = clean_llm_response(llm_response)
-                    comments = json.loads(cleaned)
-                except Exception as e:
-                    print(f"❌ Error generating or parsing feedback for {file_path}:", e)
-                    print("🔍 Raw response from Gemini:", repr(llm_response))  # <-- agrega esta línea
-                    comments = []
-
-                if comments:
-                    feedback_result.append({
-                        "filePath": file_path,
-                        "comments": comments
-                    })
-
-            # Actualizar con feedback final
-            cur.execute(
-                '''
-                UPDATE "Commit_Feedback"
-                SET
-                    status = %s,
-                    feedback = %s,
-                    analyzed_at = %s
-                WHERE sha = %s
-                ''',
-                (
-                    "analyzed" if feedback_result else "not_analyzed",
-                    json.dumps(feedback_result),
-                    datetime.utcnow(),
-                    sha
-                )
-            )
+                # El evento se reintenta entero: los commits siguen en "analyzing" y las
+                # revisiones ya hechas salen de la caché de revisiones
+                logger.error("❌ Error fetching commit data for %s: %s", sha, e)
+                raise
+
+            commits_data.append(commit_data)
+
+            feedback_result = await review_files(commit_data.get("files", []), review_commit_file)
+            log_sampled(logger, logging.DEBUG, "🔎 Commit %s: %d files with feedback", sha, len(feedback_result))
+            feedback_rows.append((
+                "analyzed" if feedback_result else "not_analyzed",
+                json.dumps(feedback_result),
+                datetime.utcnow(),
+                sha
+            ))
 
             if feedback_result:
                 summary_prompt = generate_summary_prompt(repo, sha, feedback_result, diff_lines=len(feedback_result))
 
+                summary_raw = None
                 try:
-                    summary_raw = call_llm(summary_prompt, GEMINI_KEY_2)
+                    summary_raw = await call_llm(summary_prompt)
                     cleaned_summary = clean_llm_response(summary_raw)
                     summary_data = json.loads(cleaned_summary)
-
-                    cur.execute(
-                        '''
-                        UPDATE "Commit_Feedback"
-                        SET
-                            summary = %s,
-                            quality = %s,
-                            recommended_resources = %s
-                        WHERE sha = %s
-                        ''',
-                        (
-                            summary_data.get("summary"),
-                            summary_data.get("quality"),
-                            json.dumps(summary_data.get("recommended_resources", [])),
-                            sha
-                        )
-                    )
+                    summary_rows.append((
+                        summary_data.get("summary"),
+                        summary_data.get("quality"),
+                        json.dumps(summary_data.get("recommended_resources", [])),
+                        sha
+                    ))
                 except Exception as e:
-                    print(f"❌ Error generating/parsing summary for commit {sha}:", e)
-                    print("🔍 Raw summary response:", repr(summary_raw))
-                    
+                    logger.error("❌ Error generating/parsing summary for commit %s: %s", sha, e)
+                    logger.debug("🔍 Raw summary response: %r", summary_raw)
+
+        # Resultados de todos los commits en lotes
+        record_commit_stats(cur, repo_id, commits_data)
+        execute_batch(
+            cur,
+            '''
+            UPDATE "Commit_Feedback"
+            SET
+                status = %s,
+                feedback = %s,
+                analyzed_at = %s
+            WHERE sha = %s
+            ''',
+            feedback_rows
+        )
+        execute_batch(
+            cur,
+            '''
+            UPDATE "Commit_Feedback"
+            SET
+                summary = %s,
+                quality = %s,
+                recommended_resources = %s
+            WHERE sha = %s
+            ''',
+            summary_rows
+        )
         conn.commit()
 
     except Exception as e:
-        print("❌ Error in process_push_event:", e)
+        logger.exception("❌ Error in process_push_event: %s", e)
         try:
             conn.rollback()
         except Exception as rollback_error:
-            print("⚠️ Failed to rollback transaction:", rollback_error)
+            logger.warning("⚠️ Failed to rollback transaction: %s", rollback_error)
         raise
     finally:
         if cur:
-            cur.close()
\ No newline at end of file
+            cur.close()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import config  # noqa: F401  (carga .env)
+from services.llm.review_cache import review_cache_key, get_cached_review, store_review
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Máximo de revisiones de archivo en vuelo contra el LLM, compartido por todos los eventos del proceso
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+
+_semaphore = None
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _semaphore
+
+async def cached_review(structured_lines: list, run_review) -> list:
+    """
+    Devuelve los comentarios guardados para este mismo diff o, si no hay, ejecuta
+    `run_review()` y guarda su resultado. `run_review` devuelve None cuando la
+    respuesta del LLM no se pudo usar, y en ese caso no se cachea nada.
+    """
+    cache_key = review_cache_key(structured_lines)
+    comments = await asyncio.to_thread(get_cached_review, cache_key)
+    if comments is not None:
+        return comments
+
+    comments = await run_review()
+    if comments is None:
+        return []
+
+    await asyncio.to_thread(store_review, cache_key, comments)
+    return comments
+
+async def review_files(files: list[dict], review_file) -> list[dict]:
+    """
+    Revisa los archivos en paralelo con `review_file(file)` respetando LLM_CONCURRENCY.
+
+    Los resultados se devuelven en el mismo orden que `files`; los archivos sin
+    feedback (None) o cuya revisión falla se omiten sin bloquear a los demás.
+    """
+    semaphore = _get_semaphore()
+
+    async def run(file):
+        async with semaphore:
+            try:
+                return await review_file(file)
+            except Exception as e:
+                logger.error("❌ Error reviewing %s: %s", file.get("filename"), e)
+                return None
+
+    results = await asyncio.gather(*(run(file) for file in files))
+    return [result for result in results if result]
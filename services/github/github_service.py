@@ -1,55 +1,68 @@
-import traceback
-import psycopg2
-import psycopg2.extras
-import requests
+import asyncio
+import os
+import time
 import httpx
-import json
-from database import get_connection
+from database import get_db_async
+from services.github.client import github_get, github_get_all, parse_link_header
+from services.github.credentials import get_user_github_credentials
 from fastapi import HTTPException
 from collections import defaultdict
 from datetime import datetime
-from services.github.events.pull_request import process_pull_request_event
-from services.github.events.push import process_push_event
-
-def get_user_github_credentials(user_id: int):
-    try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-
-        cur.execute('SELECT "github_token", "github_username" FROM "Employee" WHERE "id" = %s', (user_id,))
-        row = cur.fetchone()
-
-        if not row:
-            print("❌ Credenciales no encontradas")
-            raise HTTPException(status_code=404, detail="GitHub credentials not found")
-
-        token = row.get("github_token")
-        username = row.get("github_username")
-
-        if not token:
-            raise HTTPException(status_code=404, detail="GitHub token is empty")
-        if not username:
-            raise HTTPException(status_code=404, detail="GitHub username is missing")
-
-        return token, username
-
-    except Exception as e:
-        print("❌ DB error:", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
-
-def fetch_github_repos(token: str):
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github+json"
-    }
-
-    response = requests.get("https://api.github.com/user/repos?per_page=100", headers=headers)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="GitHub API error")
-
-    repos = response.json()
+from services.github.mirror import (
+    GITHUB_MIRROR_READS,
+    record_push,
+    record_pull_request,
+    get_mirrored_commits,
+    get_mirrored_pull_requests,
+    format_github_time
+)
+from services.github.aggregates import refresh_event_aggregates, get_dashboard_aggregates
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Commits por página en /github/commits (máximo de GitHub: 100)
+COMMITS_PAGE_SIZE = min(int(os.getenv("COMMITS_PAGE_SIZE", "100")), 100)
+
+# Consultas de los endpoints; scripts/check_indexes.py comprueba que usan índice
+COMMIT_STATUSES_SQL = 'SELECT sha, status FROM "Commit_Feedback" WHERE sha = ANY(%s)'
+PR_RETROS_SQL = '''
+    SELECT pr_number, retro
+    FROM "PullRequest_Feedback"
+    WHERE github_repo_id = %s AND pr_number = ANY(%s)
+'''
+COMMIT_FEEDBACK_SQL = (
+    'SELECT summary, feedback, status, recommended_resources, created_at, analyzed_at, quality '
+    'FROM "Commit_Feedback" WHERE sha = %s'
+)
+PR_FEEDBACK_SQL = '''
+    SELECT summary, feedback, retro, recommended_resources,
+           created_at, analyzed_at, quality
+    FROM "PullRequest_Feedback"
+    WHERE github_repo_id = %s AND pr_number = %s
+'''
+COMMIT_FILE_FEEDBACK_SQL = 'SELECT feedback FROM "Commit_Feedback" WHERE sha = %s'
+PR_FILE_FEEDBACK_SQL = 'SELECT feedback FROM "PullRequest_Feedback" WHERE github_repo_id = %s AND pr_number = %s'
+DASHBOARD_REPO_SQL = 'SELECT github_repo_id FROM "Repositories" WHERE repo_full_name = %s'
+DASHBOARD_RECENT_PRS_SQL = '''
+    SELECT f.pr_number, f.retro, gp.title, gp.state, gp.main_file, gp.comments, gp.review_comments,
+           gp.created_at AS gh_created_at, gp.merged_at
+    FROM "PullRequest_Feedback" f
+    LEFT JOIN "Github_PullRequest" gp
+        ON gp.github_repo_id = f.github_repo_id AND gp.pr_number = f.pr_number
+    WHERE f.github_repo_id = %s AND f.github_username = %s AND f.pr_number IS NOT NULL
+    ORDER BY f.created_at DESC NULLS LAST
+    LIMIT 5
+'''
+DASHBOARD_RECENT_COMMITS_SQL = '''
+    SELECT sha, summary, status, created_at FROM "Commit_Feedback"
+    WHERE github_repo_id = %s AND github_username = %s
+    ORDER BY created_at DESC NULLS LAST
+    LIMIT 5
+'''
+
+async def fetch_github_repos(token: str):
+    repos = await github_get_all("/user/repos", token, cache=True, error_detail="GitHub API error")
     return [
         {
             "id": repo["id"],
@@ -84,38 +97,11 @@ def humanize_date(date_str):
     else:
         return f"{delta.days} days ago"
 
-async def get_grouped_commits(token: str, repo: str, branch: str, username: str):
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-
-    url = f"https://api.github.com/repos/{repo}/commits?sha={branch}&per_page=100"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Error fetching commits")
-        data = response.json()
-
-    all_shas = [item["sha"] for item in data]
-
-    sha_status_map = {}
-    try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute(
-            'SELECT sha, status FROM "Commit_Feedback" WHERE sha = ANY(%s)',
-            (all_shas,)
-        )
-        results = cur.fetchall()
-        for row in results:
-            sha_status_map[row["sha"]] = row["status"]
-    except Exception as e:
-        print("❌ Error fetching commit statuses:", e)
-    finally:
-        conn.close()
-
+def group_commits(data: list[dict], branch: str, sha_status_map: dict) -> dict:
+    """
+    Agrupa commits con la forma de GET /repos/{repo}/commits por día ("June 03, 2025"),
+    con el estado de análisis de cada uno. Función pura: no llama a GitHub ni a la BD.
+    """
     grouped = defaultdict(list)
 
     for item in data:
@@ -123,9 +109,6 @@ async def get_grouped_commits(token: str, repo: str, branch: str, username: str)
         author_login = item["author"]["login"] if item.get("author") else None
         commit_author_name = item["commit"]["author"]["name"]
 
-        if author_login != username and commit_author_name != username:
-            continue
-
         date_str = item["commit"]["author"]["date"]
         date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%SZ")
         group_key = human_date(date)
@@ -144,84 +127,165 @@ async def get_grouped_commits(token: str, repo: str, branch: str, username: str)
 
     return dict(grouped)
 
-async def get_pull_requests(token: str, repo: str, username: str):
-    url = f"https://api.github.com/repos/{repo}/pulls?state=all&per_page=100"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
+async def get_grouped_commits(
+    token: str,
+    repo: str,
+    branch: str,
+    username: str,
+    cursor: int | None = None,
+    limit: int = COMMITS_PAGE_SIZE,
+    since: str | None = None,
+    until: str | None = None
+):
+    """
+    Devuelve una página de commits del usuario en la rama, agrupados por día, y el
+    cursor de la página siguiente (None si no hay más).
+
+    El filtro por autor y por fechas lo aplica GitHub (`author`, `since`, `until`),
+    así que cada página cuesta una llamada a GitHub y una consulta a Commit_Feedback.
+    """
+    if cursor is not None and cursor < 1:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    page = cursor or 1
+
+    data = None
+    if GITHUB_MIRROR_READS:
+        try:
+            # Se pide un elemento de más para saber si hay página siguiente.
+            # None: el espejo no tiene completo ese historial
+            data = await asyncio.to_thread(get_mirrored_commits, repo, branch, username, (page - 1) * limit, limit + 1, since, until)
+        except Exception as e:
+            logger.error("❌ Error reading mirrored commits: %s", e)
+            data = None
+
+    if data is not None:
+        next_cursor = str(page + 1) if len(data) > limit else None
+        data = data[:limit]
+    else:
+        params = {
+            "sha": branch,
+            "author": username,
+            "per_page": limit,
+            "page": page
+        }
+        if since:
+            params["since"] = since
+        if until:
+            params["until"] = until
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=headers)
+        response = await github_get(f"/repos/{repo}/commits", token, params=params, cache=True)
         if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Error fetching PRs")
-        prs = response.json()
-
-        pull_requests = []
-
-        repo_id = prs[0]["base"]["repo"]["id"] if prs else None
-        pr_numbers = [pr["number"] for pr in prs]
-        retro_map = {}
-
-        if repo_id is not None:
-            try:
-                conn = get_connection()
-                cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-                cur.execute(
-                    '''
-                    SELECT pr_number, retro
-                    FROM "PullRequest_Feedback"
-                    WHERE github_repo_id = %s AND pr_number = ANY(%s)
-                    ''',
-                    (repo_id, pr_numbers)
-                )
+            raise HTTPException(status_code=response.status_code, detail="Error fetching commits")
+        data = response.json()
+
+        next_url = parse_link_header(response.headers.get("link")).get("next")
+        next_cursor = httpx.URL(next_url).params.get("page") if next_url else None
+
+    all_shas = [item["sha"] for item in data]
+
+    sha_status_map = {}
+    try:
+        async with get_db_async() as conn:
+            cur = conn.cursor()
+            cur.execute(COMMIT_STATUSES_SQL, (all_shas,))
+            results = cur.fetchall()
+        for row in results:
+            sha_status_map[row["sha"]] = row["status"]
+    except Exception as e:
+        logger.error("❌ Error fetching commit statuses: %s", e)
+
+    return group_commits(data, branch, sha_status_map), next_cursor
+
+async def get_pull_requests(token: str, repo: str, username: str):
+    prs = None
+    if GITHUB_MIRROR_READS:
+        try:
+            prs = await asyncio.to_thread(get_mirrored_pull_requests, repo)
+        except Exception as e:
+            logger.error("❌ Error reading mirrored pull requests: %s", e)
+            prs = None
+
+    if prs is None:
+        prs = await github_get_all(
+            f"/repos/{repo}/pulls",
+            token,
+            params={"state": "all"},
+            cache=True,
+            error_detail="Error fetching PRs"
+        )
+
+    pull_requests = []
+
+    repo_id = prs[0]["base"]["repo"]["id"] if prs else None
+    pr_numbers = [pr["number"] for pr in prs]
+    retro_map = {}
+
+    if repo_id is not None:
+        try:
+            async with get_db_async() as conn:
+                cur = conn.cursor()
+                cur.execute(PR_RETROS_SQL, (repo_id, pr_numbers))
                 results = cur.fetchall()
-                for row in results:
-                    retro_map[row["pr_number"]] = row["retro"]
-            except Exception as e:
-                print("❌ Error fetching PR retro info:", e)
-            finally:
-                conn.close()
-
-        for pr in prs:
-            is_author = pr["user"]["login"] == username
-
-            #Get assigned reviewers
-            reviewers_url = pr["_links"]["self"]["href"] + "/requested_reviewers"
-            reviewers_resp = await client.get(reviewers_url, headers=headers)
-            reviewers_data = reviewers_resp.json() if reviewers_resp.status_code == 200 else {}
-            reviewers = [r["login"] for r in reviewers_data.get("users", [])]
-
-            is_reviewer = username in reviewers
-
-            if not (is_author or is_reviewer):
-                continue
-
-            if pr.get("merged_at"):
-                status = "merged"
-                date_label = f"merged {humanize_date(pr['merged_at'])}"
-            elif pr.get("closed_at"):
-                status = "closed"
-                date_label = f"closed {humanize_date(pr['closed_at'])}"
-            else:
-                status = "open"
-                date_label = f"open {humanize_date(pr['created_at'])}"
-
-            comments_count = pr.get("comments", 0) + pr.get("review_comments", 0)
-
-            pull_requests.append({
-                "title": pr["title"],
-                "number": pr["number"],
-                "author": pr["user"]["login"],
-                "date": date_label,
-                "status": status,
-                "retro": retro_map.get(pr["number"], "not_analyzed"),
-                "comments": comments_count
-            })
+            for row in results:
+                retro_map[row["pr_number"]] = row["retro"]
+        except Exception as e:
+            logger.error("❌ Error fetching PR retro info: %s", e)
+
+    for pr in prs:
+        is_author = pr["user"]["login"] == username
+
+        # Los revisores asignados ya vienen en el listado de PRs, no hace falta pedir /requested_reviewers
+        reviewers = [r["login"] for r in pr.get("requested_reviewers") or []]
+
+        is_reviewer = username in reviewers
+
+        if not (is_author or is_reviewer):
+            continue
+
+        if pr.get("merged_at"):
+            status = "merged"
+            date_label = f"merged {humanize_date(pr['merged_at'])}"
+        elif pr.get("closed_at"):
+            status = "closed"
+            date_label = f"closed {humanize_date(pr['closed_at'])}"
+        else:
+            status = "open"
+            date_label = f"open {humanize_date(pr['created_at'])}"
+
+        comments_count = pr.get("comments", 0) + pr.get("review_comments", 0)
+
+        pull_requests.append({
+            "title": pr["title"],
+            "number": pr["number"],
+            "author": pr["user"]["login"],
+            "date": date_label,
+            "status": status,
+            "retro": retro_map.get(pr["number"], "not_analyzed"),
+            "comments": comments_count
+        })
 
     return pull_requests
 
-def build_file_tree(files):
+# Datos de cada archivo que se mantienen en el modo ligero (sin `patch`)
+LIGHT_FILE_FIELDS = ("filename", "status", "additions", "deletions", "changes", "previous_filename")
+
+def light_file(file: dict) -> dict:
+    return {key: file[key] for key in LIGHT_FILE_FIELDS if key in file}
+
+def project_fields(result: dict, fields: set[str] | None) -> dict:
+    """
+    Deja solo las claves de primer nivel pedidas en `fields=` (None: todas).
+    """
+    if not fields:
+        return result
+    return {key: value for key, value in result.items() if key in fields}
+
+def build_file_tree(files, light: bool = False):
+    """
+    Árbol de carpetas/archivos ordenado por nombre. Cada hoja lleva el archivo completo
+    de GitHub en `file`; con `light=True` solo ruta, estado y líneas añadidas/borradas.
+    """
     tree = {}
 
     for file in files:
@@ -250,7 +314,13 @@ def build_file_tree(files):
                 "name": name,
                 "type": "file" if is_file else "folder",
             }
-            if is_file:
+            if is_file and light:
+                file = data["_file"]
+                entry["status"] = data["_status"]
+                entry["path"] = file["filename"]
+                entry["additions"] = file.get("additions", 0)
+                entry["deletions"] = file.get("deletions", 0)
+            elif is_file:
                 entry["status"] = data["_status"]
                 entry["file"] = data["_file"]
             else:
@@ -260,20 +330,18 @@ def build_file_tree(files):
 
     return to_array(tree)
 
-async def get_commit_feedback(token: str, repo: str, sha: str):
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
-
-    url = f"https://api.github.com/repos/{repo}/commits/{sha}"
-
-    async with httpx.AsyncClient() as client:
-        res = await client.get(url, headers=headers)
-        data = res.json()
+async def get_commit_feedback(token: str, repo: str, sha: str, fields: set[str] | None = None, light: bool = False):
+    """
+    Detalle de un commit con su feedback. `fields` limita las claves devueltas y con
+    `light=True` ni `files` ni `file_tree` llevan el `patch` (ver get_commit_file_feedback).
+    """
+    res = await github_get(f"/repos/{repo}/commits/{sha}", token)
+    data = res.json()
 
     files_data = data.get("files", [])
-    file_tree = build_file_tree(files_data)
+    file_tree = build_file_tree(files_data, light) if not fields or "file_tree" in fields else None
+    if light:
+        files_data = [light_file(f) for f in files_data]
     commit_data = data.get("commit", {})
     author_data = commit_data.get("author", {})
 
@@ -294,13 +362,10 @@ async def get_commit_feedback(token: str, repo: str, sha: str):
     quality = None
 
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute(
-            'SELECT summary, feedback, status, recommended_resources, created_at, analyzed_at, quality FROM "Commit_Feedback" WHERE sha = %s',
-            (sha,)
-        )
-        row = cur.fetchone()
+        async with get_db_async() as conn:
+            cur = conn.cursor()
+            cur.execute(COMMIT_FEEDBACK_SQL, (sha,))
+            row = cur.fetchone()
         if row:
             summary = row["summary"]
             feedback = row["feedback"] if isinstance(row["feedback"], list) else []
@@ -310,11 +375,9 @@ async def get_commit_feedback(token: str, repo: str, sha: str):
             analyzed_at = row.get("analyzed_at")
             quality = row.get("quality")
     except Exception as e:
-        print("❌ Error fetching Commit_Feedback:", e)
-    finally:
-        conn.close()
+        logger.error("❌ Error fetching Commit_Feedback: %s", e)
 
-    return {
+    return project_fields({
         "info": {
             "title": title,
             "date": date_str,
@@ -337,19 +400,14 @@ async def get_commit_feedback(token: str, repo: str, sha: str):
         "recommended_resources": recommended_resources,
         "files": files_data,
         "file_tree": file_tree
-    }
+    }, fields)
 
-async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
-
-    url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-
-    async with httpx.AsyncClient() as client:
-        res = await client.get(url, headers=headers)
-        data = res.json()
+async def get_pull_request_feedback(token: str, repo: str, pr_number: int, fields: set[str] | None = None, light: bool = False):
+    """
+    Detalle de un PR con su feedback; `fields` y `light` como en get_commit_feedback.
+    """
+    res = await github_get(f"/repos/{repo}/pulls/{pr_number}", token)
+    data = res.json()
 
     title = data.get("title", "No title")
     date_raw = data.get("created_at", "")
@@ -374,7 +432,7 @@ async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
 
     files_url = data.get("url")
     if not files_url or not files_url.startswith("http"):
-        files_url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/files"
+        files_url = f"/repos/{repo}/pulls/{pr_number}/files"
     else:
         files_url = files_url + "/files"
 
@@ -384,14 +442,11 @@ async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
         "deletions": 0,
         "total": 0
     }
-    files_data = []
-    async with httpx.AsyncClient() as client:
-        files_res = await client.get(files_url, headers=headers)
-        try:
-            files_data = files_res.json()
-        except Exception as e:
-            print("❌ Error decoding GitHub PR files response:", e)
-            files_data = []
+    try:
+        files_data = await github_get_all(files_url, token, error_detail="Error fetching PR files")
+    except Exception as e:
+        logger.error("❌ Error fetching GitHub PR files: %s", e)
+        files_data = []
 
     if isinstance(files_data, list):
         for f in files_data:
@@ -401,10 +456,12 @@ async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
                 stats["deletions"] += f.get("deletions", 0)
         stats["total"] = stats["additions"] + stats["deletions"]
     else:
-        print("⚠️ Warning: files_data is not a list.")
+        logger.warning("⚠️ Warning: files_data is not a list.")
         files_data = []
 
-    file_tree = build_file_tree(files_data)
+    file_tree = build_file_tree(files_data, light) if not fields or "file_tree" in fields else None
+    if light:
+        files_data = [light_file(f) for f in files_data]
 
     summary = "This pull request has not been analyzed yet."
     feedback = []
@@ -415,19 +472,10 @@ async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
     quality = None
 
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-
-        cur.execute(
-            '''
-            SELECT summary, feedback, retro, recommended_resources,
-                   created_at, analyzed_at, quality
-            FROM "PullRequest_Feedback"
-            WHERE github_repo_id = %s AND pr_number = %s
-            ''',
-            (github_repo_id, pr_number)
-        )
-        row = cur.fetchone()
+        async with get_db_async() as conn:
+            cur = conn.cursor()
+            cur.execute(PR_FEEDBACK_SQL, (github_repo_id, pr_number))
+            row = cur.fetchone()
 
         if row:
             summary = row["summary"]
@@ -438,11 +486,9 @@ async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
             analyzed_at = row.get("analyzed_at")
             quality = row.get("quality")
     except Exception as e:
-        print("❌ Error fetching PullRequest_Feedback:", e)
-    finally:
-        conn.close()
+        logger.error("❌ Error fetching PullRequest_Feedback: %s", e)
 
-    return {
+    return project_fields({
         "info": {
             "title": title,
             "date": date_str,
@@ -462,291 +508,293 @@ async def get_pull_request_feedback(token: str, repo: str, pr_number: int):
         "recommended_resources": recommended_resources,
         "files": files_data,
         "file_tree": file_tree
-    }
+    }, fields)
 
-async def fetch_github_branches(token: str, repo: str):
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github.v3+json"
+def _file_with_feedback(files: list[dict], feedback, path: str) -> dict:
+    file = next((f for f in files if f.get("filename") == path), None)
+    if file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    comments = []
+    for entry in feedback if isinstance(feedback, list) else []:
+        if entry.get("filePath") == path:
+            comments = entry.get("comments", [])
+            break
+
+    return {
+        **light_file(file),
+        "patch": file.get("patch"),
+        "comments": comments
     }
 
-    async with httpx.AsyncClient() as client:
-        repo_url = f"https://api.github.com/repos/{repo}"
-        repo_response = await client.get(repo_url, headers=headers)
-        if repo_response.status_code != 200:
-            raise HTTPException(status_code=repo_response.status_code, detail="Error fetching repo info")
-        repo_data = repo_response.json()
-
-        branches_url = f"https://api.github.com/repos/{repo}/branches"
-        branches_response = await client.get(branches_url, headers=headers)
-        if branches_response.status_code != 200:
-            raise HTTPException(status_code=branches_response.status_code, detail="Error fetching branches")
-        branches_data = branches_response.json()
-        branches = [b["name"] for b in branches_data]
-
-        default_branch = (
-            repo_data.get("default_branch") or
-            (branches[0] if branches else "main")
-        )
+async def get_commit_file_feedback(token: str, repo: str, sha: str, path: str):
+    """
+    Patch y comentarios de un solo archivo del commit, para cargarlos al abrirlo.
+    """
+    # El contenido de un commit no cambia: la respuesta se revalida con ETag
+    res = await github_get(f"/repos/{repo}/commits/{sha}", token, cache=True)
+    if res.status_code != 200:
+        raise HTTPException(status_code=res.status_code, detail="Error fetching commit")
 
-        return {
-            "branches": branches,
-            "default_branch": default_branch
-        }
+    feedback = []
+    try:
+        async with get_db_async() as conn:
+            cur = conn.cursor()
+            cur.execute(COMMIT_FILE_FEEDBACK_SQL, (sha,))
+            row = cur.fetchone()
+        if row:
+            feedback = row["feedback"]
+    except Exception as e:
+        logger.error("❌ Error fetching Commit_Feedback: %s", e)
+
+    return _file_with_feedback(res.json().get("files", []), feedback, path)
+
+async def get_pull_request_file_feedback(token: str, repo: str, pr_number: int, path: str):
+    """
+    Patch y comentarios de un solo archivo del PR, para cargarlos al abrirlo.
+    """
+    files_data = await github_get_all(
+        f"/repos/{repo}/pulls/{pr_number}/files",
+        token,
+        cache=True,
+        error_detail="Error fetching PR files"
+    )
+
+    # El id del repositorio sale del PR, como en get_pull_request_feedback (el nombre puede
+    # haber cambiado o no estar en "Repositories"); con cache=True suele ser un 304
+    pr_response = await github_get(f"/repos/{repo}/pulls/{pr_number}", token, cache=True)
+    if pr_response.status_code != 200:
+        raise HTTPException(status_code=pr_response.status_code, detail="Error fetching PR")
+    github_repo_id = pr_response.json().get("base", {}).get("repo", {}).get("id")
 
-async def process_github_event(event_type: str, payload: dict):
-    conn = None
+    feedback = []
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-
-        # 1. Save raw event
-        cur.execute(
-            '''
-            INSERT INTO "Github_Event" (event_type, payload, status, created_at)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-            ''',
-            (event_type, json.dumps(payload), "pending", datetime.utcnow())
-        )
+        async with get_db_async() as conn:
+            cur = conn.cursor()
+            cur.execute(PR_FILE_FEEDBACK_SQL, (github_repo_id, pr_number))
+            row = cur.fetchone()
+        if row:
+            feedback = row["feedback"]
+    except Exception as e:
+        logger.error("❌ Error fetching PullRequest_Feedback: %s", e)
 
-        result = cur.fetchone()
-        if result is None:
-            conn.rollback()
-            raise Exception("No se pudo obtener el ID del evento insertado.")
+    return _file_with_feedback(files_data, feedback, path)
 
-        event_id = result["id"]
-        conn.commit()
+async def fetch_github_branches(token: str, repo: str):
+    repo_response = await github_get(f"/repos/{repo}", token, cache=True)
+    if repo_response.status_code != 200:
+        raise HTTPException(status_code=repo_response.status_code, detail="Error fetching repo info")
+    repo_data = repo_response.json()
+
+    branches_data = await github_get_all(
+        f"/repos/{repo}/branches",
+        token,
+        cache=True,
+        error_detail="Error fetching branches"
+    )
+    branches = [b["name"] for b in branches_data]
+
+    default_branch = (
+        repo_data.get("default_branch") or
+        (branches[0] if branches else "main")
+    )
 
-        # 2. Handle event
+    return {
+        "branches": branches,
+        "default_branch": default_branch
+    }
+
+async def process_github_event(event_type: str, payload: dict, conn):
+    """
+    Ejecuta el handler del evento ya guardado en `Github_Event`.
+    Lo invocan los workers de `services.github.event_queue`.
+
+    Los handlers (y con ellos el cliente de Gemini) se importan aquí y no al cargar el
+    módulo: las peticiones de la API no los necesitan y así no pesan en el arranque en frío.
+    """
+    try:
         if event_type == "push":
-            process_push_event(payload, conn)
+            from services.github.events.push import process_push_event
+            record_push(conn, payload)
+            await process_push_event(payload, conn)
         elif event_type == "pull_request":
-            process_pull_request_event(payload, conn)
+            from services.github.events.pull_request import process_pull_request_event
+            record_pull_request(conn, payload)
+            await process_pull_request_event(payload, conn)
 
-        # 3. Mark event as done
-        cur.execute(
-            '''UPDATE "Github_Event" SET status = %s, processed_at = %s WHERE id = %s''',
-            ("done", datetime.utcnow(), event_id)
-        )
-        conn.commit()
+        # Los handlers ya han hecho commit: se recalculan los días del dashboard afectados
+        # (feedback nuevo, calidad del resumen o un PR que se mergea/cierra)
+        if event_type in ("push", "pull_request"):
+            refresh_event_aggregates(conn, event_type, payload)
 
     except Exception as e:
-        print("❌ Error processing GitHub event:", str(e))
-        traceback.print_exc()
+        logger.exception("❌ Error processing GitHub event: %s", e)
         raise
 
-    finally:
-        if conn:
-            conn.close()
-
 from collections import defaultdict
 from datetime import datetime
 from fastapi import HTTPException
-from psycopg2.extras import RealDictCursor
-import httpx
+
+async def _fetch_dashboard_pr(repo_full_name: str, token: str, pr_number: int):
+    """
+    Devuelve el PR de GitHub con `main_file`, o None si GitHub falla.
+    Solo se usa para los PRs recientes que todavía no están en el espejo.
+    """
+    res, files_res = await asyncio.gather(
+        github_get(f"/repos/{repo_full_name}/pulls/{pr_number}", token),
+        github_get(f"/repos/{repo_full_name}/pulls/{pr_number}/files", token)
+    )
+
+    if res.status_code != 200:
+        logger.warning("⚠️ PR #%s falló al obtenerse desde GitHub. Status: %s", pr_number, res.status_code)
+        return None
+
+    gh = res.json()
+    gh["main_file"] = "unknown.js"
+    if files_res.status_code == 200:
+        files = files_res.json()
+        if files:
+            gh["main_file"] = files[0].get("filename", "unknown.js")
+    return gh
+
+def _format_timeline(buckets: list[dict], count_field: str) -> dict:
+    # Últimos 30 días con actividad; la calidad es la media del día
+    days = [b for b in buckets if b[count_field]][-30:]
+    return {
+        "days": [b["day"].isoformat() for b in days],
+        "quality": [round(b["quality_sum"] / b["quality_count"], 2) if b["quality_count"] else 0 for b in days],
+        "count": [b[count_field] for b in days]
+    }
 
 async def get_repo_dashboard(repo_full_name: str, token: str, username: str):
-    print(f"🚀 Iniciando dashboard para repo: {repo_full_name}, usuario: {username}")
+    """
+    KPIs y timelines salen de "Dashboard_Daily" (una lectura por índice, ver
+    services/github/aggregates.py); los 5 PRs y commits recientes se leen aparte.
+    """
+    logger.debug("🚀 Iniciando dashboard para repo: %s, usuario: %s", repo_full_name, username)
+
+    timings = {}
+    phase_started = time.perf_counter()
 
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        print("🔍 Buscando ID del repositorio en la BD...")
-        cur.execute('SELECT github_repo_id FROM "Repositories" WHERE repo_full_name = %s', (repo_full_name,))
-        repo = cur.fetchone()
-        if not repo:
-            print("❌ Repositorio no encontrado en la base de datos.")
-            raise HTTPException(status_code=404, detail="Repository not found")
-        github_id = repo["github_repo_id"]
-        print(f"✅ Repositorio encontrado. ID: {github_id}")
-
-        print("📥 Obteniendo feedback de PRs y Commits...")
-        cur.execute('''
-            SELECT * FROM "PullRequest_Feedback"
-            WHERE github_repo_id = %s AND github_username = %s
-        ''', (github_id, username))
-        pr_feedback = cur.fetchall()
-
-        cur.execute('''
-            SELECT * FROM "Commit_Feedback"
-            WHERE github_repo_id = %s AND github_username = %s
-        ''', (github_id, username))
-        commit_feedback = cur.fetchall()
-
-        print(f"🔎 Total PR feedbacks: {len(pr_feedback)}, Commit feedbacks: {len(commit_feedback)}")
+        async with get_db_async() as conn:
+            cur = conn.cursor()
+
+            cur.execute(DASHBOARD_REPO_SQL, (repo_full_name,))
+            repo = cur.fetchone()
+            if not repo:
+                logger.info("❌ Repositorio no encontrado en la base de datos: %s", repo_full_name)
+                raise HTTPException(status_code=404, detail="Repository not found")
+            github_id = repo["github_repo_id"]
+
+            buckets = get_dashboard_aggregates(cur, github_id, username)
+
+            cur.execute(DASHBOARD_RECENT_PRS_SQL, (github_id, username))
+            pr_rows = cur.fetchall()
+
+            cur.execute(DASHBOARD_RECENT_COMMITS_SQL, (github_id, username))
+            commit_rows = cur.fetchall()
+
+        timings["db"] = time.perf_counter() - phase_started
+        phase_started = time.perf_counter()
+
+        # PRs recientes que aún no están en el espejo: como mucho 5 llamadas a GitHub
+        missing = [row["pr_number"] for row in pr_rows if row["gh_created_at"] is None]
+        fetched = await asyncio.gather(
+            *(_fetch_dashboard_pr(repo_full_name, token, pr_number) for pr_number in missing),
+            return_exceptions=True
+        )
+        fetched = dict(zip(missing, fetched))
+
+        timings["github"] = time.perf_counter() - phase_started
+        phase_started = time.perf_counter()
+
+        pr_buckets = [b for b in buckets if b["kind"] == "pr"]
+        commit_buckets = [b for b in buckets if b["kind"] == "commit"]
+
+        total_prs = sum(b["items"] for b in pr_buckets)
+        total_commits = sum(b["items"] for b in commit_buckets)
+        merge_count = sum(b["merged_count"] for b in pr_buckets)
 
         kpis = {
-            "total_prs": 0,
-            "analyzed_prs": len(pr_feedback),
-            "total_commits": 0,
-            "analyzed_commits": len(commit_feedback),
-            "avg_quality_prs": 0,
-            "avg_quality_commits": 0,
-            "total_lines_added": 0,
-            "total_lines_deleted": 0,
-            "avg_merge_time_days": 0
+            "total_prs": total_prs,
+            "analyzed_prs": total_prs,
+            "total_commits": total_commits,
+            "analyzed_commits": total_commits,
+            "avg_quality_prs": round(sum(b["quality_sum"] for b in pr_buckets) / total_prs, 2) if total_prs else 0,
+            "avg_quality_commits": round(sum(b["quality_sum"] for b in commit_buckets) / total_commits, 2) if total_commits else 0,
+            "total_lines_added": sum(b["lines_added"] for b in buckets),
+            "total_lines_deleted": sum(b["lines_deleted"] for b in buckets),
+            "avg_merge_time_days": round(sum(b["merge_days_sum"] for b in pr_buckets) / merge_count, 2) if merge_count else 0
         }
 
-        prs_quality_sum = 0
-        commits_quality_sum = 0
-        prs_timeline = defaultdict(list)
-        commits_timeline = defaultdict(list)
-        recent_prs = []
-        recent_commits = []
-        total_merge_days = 0
-        merge_count = 0
-
-        async with httpx.AsyncClient() as client:
-            # Procesar PRs
-            for pr in pr_feedback:
-                try:
-                    pr_number = pr.get("pr_number")
-                    if not pr_number:
-                        continue
-
-                    # Info general del PR
-                    res = await client.get(
-                        f"https://api.github.com/repos/{repo_full_name}/pulls/{pr_number}",
-                        headers={"Authorization": f"Bearer {token}"}
-                    )
-                    if res.status_code != 200:
-                        print(f"⚠️ PR #{pr_number} falló al obtenerse desde GitHub. Status: {res.status_code}")
-                        continue
-
-                    gh = res.json()
-                    kpis["total_prs"] += 1
-
-                    # Fecha de creación y calidad
-                    created_str = gh.get("created_at")
-                    created = datetime.strptime(created_str, "%Y-%m-%dT%H:%M:%SZ").date() if created_str else None
-                    quality = pr.get("quality")
-
-                    if quality and created:
-                        prs_quality_sum += quality
-                        prs_timeline[created].append(quality)
-
-                    # Tiempo de merge
-                    merged_str = gh.get("merged_at")
-                    if created and merged_str:
-                        merged = datetime.strptime(merged_str, "%Y-%m-%dT%H:%M:%SZ")
-                        merge_days = (merged.date() - created).days
-                        total_merge_days += merge_days
-                        merge_count += 1
-
-                    # Archivos del PR para contar líneas y elegir el archivo principal
-                    files_res = await client.get(
-                        f"https://api.github.com/repos/{repo_full_name}/pulls/{pr_number}/files",
-                        headers={"Authorization": f"Bearer {token}"}
-                    )
-                    main_file = "unknown.js"
-                    if files_res.status_code == 200:
-                        files = files_res.json()
-                        if files:
-                            main_file = files[0].get("filename", "unknown.js")
-                        for f in files:
-                            kpis["total_lines_added"] += f.get("additions", 0)
-                            kpis["total_lines_deleted"] += f.get("deletions", 0)
-
-                    # Guardar info del PR
-                    recent_prs.append({
-                        "title": gh.get("title", "Untitled PR"),
-                        "file": main_file,
-                        "retro": pr.get("retro") or "not_analyzed",
-                        "comments": gh.get("comments", 0) + gh.get("review_comments", 0),
-                        "created_at": created_str,
-                        "merged_at": merged_str,
-                        "state": gh.get("state", "unknown")
-                    })
-
-                except Exception as e:
-                    print(f"❌ Error procesando PR #{pr.get('pr_number')}: {e}")
-
-            # Procesar Commits
-            for commit in commit_feedback:
-                try:
-                    sha = commit.get("sha")
-                    kpis["total_commits"] += 1
-                    quality = commit.get("quality")
-                    if quality:
-                        commits_quality_sum += quality
-
-                    created = commit.get("created_at")
-                    if isinstance(created, datetime):
-                        commits_timeline[created.date()].append(quality)
-
-                    # Llamar al endpoint del commit para líneas añadidas/borradas
-                    if sha:
-                        res = await client.get(
-                            f"https://api.github.com/repos/{repo_full_name}/commits/{sha}",
-                            headers={"Authorization": f"Bearer {token}"}
-                        )
-                        if res.status_code == 200:
-                            stats = res.json().get("stats", {})
-                            additions = stats.get("additions", 0)
-                            deletions = stats.get("deletions", 0)
-                            kpis["total_lines_added"] += additions
-                            kpis["total_lines_deleted"] += deletions
-                            print(f"📄 Commit {sha}: +{additions} -{deletions}")
-                        else:
-                            print(f"⚠️ No se pudo obtener stats para commit {sha}, status: {res.status_code}")
-
-                    recent_commits.append({
-                        "sha": sha,
-                        "message": commit.get("summary", "No message"),
-                        "status": commit.get("status", "not_analyzed"),
-                        "created_at": created.isoformat() if isinstance(created, datetime) else "unknown"
-                    })
-                except Exception as e:
-                    print(f"❌ Error procesando commit {commit.get('sha')}: {e}")
-
-        # Calcular promedios
-        if pr_feedback:
-            kpis["avg_quality_prs"] = round(prs_quality_sum / len(pr_feedback), 2)
-        if commit_feedback:
-            kpis["avg_quality_commits"] = round(commits_quality_sum / len(commit_feedback), 2)
-        if merge_count:
-            kpis["avg_merge_time_days"] = round(total_merge_days / merge_count, 2)
-
-        # Formatear timeline
-        def format_timeline(source):
-            days = sorted(source.keys())[-30:]
-            return {
-                "days": [day.isoformat() for day in days],
-                "quality": [round(sum(values) / len(values), 2) if values else 0 for values in [source[d] for d in days]],
-                "count": [len(source[d]) for d in days]
-            }
-
         timeline = {
-            "prs": format_timeline(prs_timeline),
-            "commits": format_timeline(commits_timeline)
+            "prs": _format_timeline(pr_buckets, "quality_count"),
+            "commits": _format_timeline(commit_buckets, "items")
         }
 
-        user = {
-            "username": username,
-            "avatar_url": f"https://github.com/{username}.png"
-        }
+        recent_prs = []
+        for row in pr_rows:
+            if row["gh_created_at"] is not None:
+                gh = {
+                    "title": row["title"],
+                    "main_file": row["main_file"] or "unknown.js",
+                    "comments": row["comments"] or 0,
+                    "review_comments": row["review_comments"] or 0,
+                    "created_at": format_github_time(row["gh_created_at"]),
+                    "merged_at": format_github_time(row["merged_at"]),
+                    "state": row["state"]
+                }
+            else:
+                gh = fetched.get(row["pr_number"])
+                if isinstance(gh, Exception):
+                    logger.error("❌ Error procesando PR #%s: %s", row["pr_number"], gh)
+                    continue
+                if gh is None:
+                    continue
+
+            recent_prs.append({
+                "title": gh.get("title") or "Untitled PR",
+                "file": gh["main_file"],
+                "retro": row["retro"] or "not_analyzed",
+                "comments": (gh.get("comments") or 0) + (gh.get("review_comments") or 0),
+                "created_at": gh.get("created_at"),
+                "merged_at": gh.get("merged_at"),
+                "state": gh.get("state") or "unknown"
+            })
+
+        recent_commits = [
+            {
+                "sha": row["sha"],
+                "message": row["summary"] or "No message",
+                "status": row["status"] or "not_analyzed",
+                "created_at": row["created_at"].isoformat() if isinstance(row["created_at"], datetime) else "unknown"
+            }
+            for row in commit_rows
+        ]
 
         result = {
-            "user": user,
+            "user": {
+                "username": username,
+                "avatar_url": f"https://github.com/{username}.png"
+            },
             "kpis": kpis,
             "timeline": timeline,
             "recent": {
-                "prs": recent_prs[:5],
-                "commits": recent_commits[:5]
+                "prs": recent_prs,
+                "commits": recent_commits
             }
         }
 
-        import json
-        print("📦 Payload enviado al frontend:", json.dumps(result, indent=2, default=str))
+        timings["aggregate"] = time.perf_counter() - phase_started
+        logger.info(
+            "⏱️ Dashboard timings: db=%.1fms, github=%.1fms, aggregate=%.1fms (%d buckets, %d PRs from GitHub)",
+            timings["db"] * 1000, timings["github"] * 1000, timings["aggregate"] * 1000, len(buckets), len(missing)
+        )
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print("❌ Error general en get_repo_dashboard:", e)
+        logger.exception("❌ Error general en get_repo_dashboard: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error in dashboard")
-
-    finally:
-        if conn:
-            conn.close()
-        print("🔚 Conexión cerrada.")
@@ -0,0 +1,452 @@
+import json
+import os
+import sys
+from datetime import datetime, timezone
+import config  # noqa: F401  (carga .env)
+from psycopg2.extras import execute_batch, execute_values
+from database import get_db, get_db_async
+from services.github.aggregates import refresh_pull_request_buckets
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Con "true" /github/commits y /github/pull-requests leen del espejo local cuando
+# "Github_Mirror_Coverage" indica que tiene el historial completo; si no, leen de GitHub
+GITHUB_MIRROR_READS = os.getenv("GITHUB_MIRROR_READS", "false").lower() == "true"
+
+GITHUB_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Lecturas del espejo; scripts/check_indexes.py comprueba que usan índice
+MIRROR_COVERAGE_SQL = '''
+    SELECT complete_since FROM "Github_Mirror_Coverage"
+    WHERE repo_full_name = %s AND kind = %s AND branch = %s
+'''
+MIRRORED_COMMITS_SQL = '''
+    SELECT sha, message, author_login, author_name, committed_at, verified
+    FROM "Github_Commit"
+    WHERE repo_full_name = %s AND branch = %s
+      AND (author_login = %s OR author_name = %s)
+      AND (%s::timestamp IS NULL OR committed_at >= %s::timestamp)
+      AND (%s::timestamp IS NULL OR committed_at <= %s::timestamp)
+    ORDER BY committed_at DESC, sha
+    OFFSET %s LIMIT %s
+'''
+MIRRORED_PULL_REQUESTS_SQL = '''
+    SELECT * FROM "Github_PullRequest"
+    WHERE repo_full_name = %s
+    ORDER BY pr_number DESC
+'''
+
+def parse_github_time(value: str | None) -> datetime | None:
+    """
+    Convierte una fecha ISO 8601 de GitHub ("...Z" o con offset) a datetime UTC sin zona.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def format_github_time(value: datetime | None) -> str | None:
+    return value.strftime(GITHUB_DATE_FORMAT) if value else None
+
+def record_push(conn, payload: dict):
+    """
+    Guarda en "Github_Commit" los commits de un evento push, uno por (repo, rama, sha).
+    """
+    repo = payload.get("repository", {})
+    ref = payload.get("ref") or ""
+    if not ref.startswith("refs/heads/"):
+        return
+    branch = ref[len("refs/heads/"):]
+
+    if payload.get("forced") or payload.get("deleted"):
+        # Force-push o rama borrada: el historial guardado ya no es el de la rama. Se
+        # descarta y se quita la cobertura, así las lecturas van a GitHub hasta el próximo sync
+        cur = conn.cursor()
+        cur.execute(
+            'DELETE FROM "Github_Mirror_Coverage" WHERE repo_full_name = %s AND kind = %s AND branch = %s',
+            (repo.get("full_name"), "commits", branch)
+        )
+        cur.execute(
+            'DELETE FROM "Github_Commit" WHERE github_repo_id = %s AND branch = %s',
+            (repo.get("id"), branch)
+        )
+        conn.commit()
+        logger.info("🧹 Mirror of %s:%s discarded after a %s push.", repo.get("full_name"), branch, "deleting" if payload.get("deleted") else "forced")
+
+    rows = []
+    for commit in payload.get("commits", []):
+        author = commit.get("author") or {}
+        rows.append((
+            repo.get("id"),
+            repo.get("full_name"),
+            branch,
+            commit.get("id"),
+            commit.get("message"),
+            author.get("username"),
+            author.get("name"),
+            parse_github_time(commit.get("timestamp")),
+            datetime.utcnow()
+        ))
+
+    if not rows:
+        return
+
+    cur = conn.cursor()
+    execute_values(
+        cur,
+        '''
+        INSERT INTO "Github_Commit"
+            (github_repo_id, repo_full_name, branch, sha, message, author_login, author_name, committed_at, updated_at)
+        VALUES %s
+        ON CONFLICT (github_repo_id, branch, sha) DO UPDATE
+        SET message = EXCLUDED.message,
+            author_login = COALESCE(EXCLUDED.author_login, "Github_Commit".author_login),
+            author_name = EXCLUDED.author_name,
+            committed_at = EXCLUDED.committed_at,
+            updated_at = EXCLUDED.updated_at
+        ''',
+        rows
+    )
+    conn.commit()
+
+def record_commit_stats(cur, github_repo_id: int, commits_data: list[dict]):
+    """
+    Completa líneas añadidas/borradas y verificación con las respuestas de /commits/{sha}.
+    """
+    now = datetime.utcnow()
+    rows = []
+    for commit_data in commits_data:
+        stats = commit_data.get("stats") or {}
+        verified = (commit_data.get("commit") or {}).get("verification", {}).get("verified", False)
+        rows.append((stats.get("additions", 0), stats.get("deletions", 0), verified, now, github_repo_id, commit_data.get("sha")))
+
+    execute_batch(
+        cur,
+        '''
+        UPDATE "Github_Commit"
+        SET additions = %s, deletions = %s, verified = %s, updated_at = %s
+        WHERE github_repo_id = %s AND sha = %s
+        ''',
+        rows
+    )
+
+def record_pull_request(conn, payload: dict):
+    """
+    Guarda en "Github_PullRequest" el estado del PR que trae cualquier evento pull_request.
+    """
+    pr = payload.get("pull_request") or {}
+    repo = payload.get("repository", {})
+    if not pr.get("number"):
+        return
+
+    cur = conn.cursor()
+    cur.execute(
+        '''
+        INSERT INTO "Github_PullRequest"
+            (github_repo_id, pr_number, repo_full_name, title, state, author_login, requested_reviewers,
+             head_ref, base_ref, head_sha, comments, review_comments, additions, deletions, changed_files,
+             created_at, closed_at, merged_at, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (github_repo_id, pr_number) DO UPDATE
+        SET repo_full_name = EXCLUDED.repo_full_name,
+            title = EXCLUDED.title,
+            state = EXCLUDED.state,
+            author_login = EXCLUDED.author_login,
+            requested_reviewers = EXCLUDED.requested_reviewers,
+            head_ref = EXCLUDED.head_ref,
+            base_ref = EXCLUDED.base_ref,
+            head_sha = EXCLUDED.head_sha,
+            comments = EXCLUDED.comments,
+            review_comments = EXCLUDED.review_comments,
+            additions = EXCLUDED.additions,
+            deletions = EXCLUDED.deletions,
+            changed_files = EXCLUDED.changed_files,
+            created_at = EXCLUDED.created_at,
+            closed_at = EXCLUDED.closed_at,
+            merged_at = EXCLUDED.merged_at,
+            updated_at = EXCLUDED.updated_at
+        WHERE "Github_PullRequest".updated_at IS NULL OR "Github_PullRequest".updated_at <= EXCLUDED.updated_at
+        ''',
+        (
+            repo.get("id"),
+            pr.get("number"),
+            repo.get("full_name"),
+            pr.get("title"),
+            pr.get("state"),
+            (pr.get("user") or {}).get("login"),
+            [r["login"] for r in pr.get("requested_reviewers") or []],
+            (pr.get("head") or {}).get("ref"),
+            (pr.get("base") or {}).get("ref"),
+            (pr.get("head") or {}).get("sha"),
+            pr.get("comments", 0),
+            pr.get("review_comments", 0),
+            pr.get("additions"),
+            pr.get("deletions"),
+            pr.get("changed_files"),
+            parse_github_time(pr.get("created_at")),
+            parse_github_time(pr.get("closed_at")),
+            parse_github_time(pr.get("merged_at")),
+            parse_github_time(pr.get("updated_at")) or datetime.utcnow()
+        )
+    )
+    conn.commit()
+
+def record_pull_request_files(cur, github_repo_id: int, pr_number: int, files: list[dict]):
+    """
+    Guarda el primer archivo del PR, que el dashboard muestra como archivo principal.
+    """
+    cur.execute(
+        'UPDATE "Github_PullRequest" SET main_file = %s WHERE github_repo_id = %s AND pr_number = %s',
+        (files[0].get("filename") if files else None, github_repo_id, pr_number)
+    )
+
+def _to_github_commit(row: dict) -> dict:
+    # Misma forma que un elemento de GET /repos/{repo}/commits, para reutilizar el agrupado
+    return {
+        "sha": row["sha"],
+        "author": {"login": row["author_login"]} if row["author_login"] else None,
+        "commit": {
+            "message": row["message"],
+            "author": {
+                "name": row["author_name"],
+                "date": format_github_time(row["committed_at"])
+            },
+            "verification": {"verified": bool(row["verified"])}
+        }
+    }
+
+def _to_github_pull_request(row: dict) -> dict:
+    # Misma forma que un elemento de GET /repos/{repo}/pulls
+    return {
+        "number": row["pr_number"],
+        "title": row["title"],
+        "state": row["state"],
+        "user": {"login": row["author_login"]},
+        "requested_reviewers": [{"login": login} for login in row["requested_reviewers"] or []],
+        "comments": row["comments"] or 0,
+        "review_comments": row["review_comments"] or 0,
+        "additions": row["additions"],
+        "deletions": row["deletions"],
+        "created_at": format_github_time(row["created_at"]),
+        "closed_at": format_github_time(row["closed_at"]),
+        "merged_at": format_github_time(row["merged_at"]),
+        "main_file": row["main_file"],
+        "base": {"repo": {"id": row["github_repo_id"]}}
+    }
+
+def _is_covered(cur, repo_full_name: str, kind: str, branch: str = "", since: str | None = None) -> bool:
+    """
+    True si el espejo tiene completo el historial pedido: hay fila de cobertura y, si la
+    sincronización empezó en una fecha, la consulta no pide nada anterior a ella.
+    """
+    cur.execute(MIRROR_COVERAGE_SQL, (repo_full_name, kind, branch))
+    row = cur.fetchone()
+    if row is None:
+        return False
+    if row["complete_since"] is None:
+        return True
+    requested_since = parse_github_time(since)
+    return requested_since is not None and requested_since >= row["complete_since"]
+
+def get_mirrored_commits(
+    repo_full_name: str,
+    branch: str,
+    username: str,
+    offset: int,
+    limit: int,
+    since: str | None = None,
+    until: str | None = None
+) -> list[dict] | None:
+    """
+    Página de commits del espejo, o None si el espejo no cubre esa rama (o esas fechas)
+    y hay que preguntar a GitHub. Una lista vacía es una respuesta válida.
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        if not _is_covered(cur, repo_full_name, "commits", branch, since):
+            return None
+        cur.execute(
+            MIRRORED_COMMITS_SQL,
+            (
+                repo_full_name, branch, username, username,
+                parse_github_time(since), parse_github_time(since),
+                parse_github_time(until), parse_github_time(until),
+                offset, limit
+            )
+        )
+        rows = cur.fetchall()
+    return [_to_github_commit(row) for row in rows]
+
+def get_mirrored_pull_requests(repo_full_name: str) -> list[dict] | None:
+    """
+    Todos los PRs del repositorio según el espejo, o None si no está sincronizado.
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        if not _is_covered(cur, repo_full_name, "pull_requests"):
+            return None
+        cur.execute(MIRRORED_PULL_REQUESTS_SQL, (repo_full_name,))
+        rows = cur.fetchall()
+    return [_to_github_pull_request(row) for row in rows]
+
+def backfill_mirror(batch_size: int = 500) -> int:
+    """
+    Rellena el espejo reproduciendo los eventos push y pull_request ya guardados en "Github_Event".
+    Es idempotente: los upserts dejan siempre el estado más reciente.
+    """
+    replayed = 0
+    last_id = 0
+    while True:
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                '''
+                SELECT id, event_type, payload FROM "Github_Event"
+                WHERE id > %s AND event_type IN ('push', 'pull_request')
+                ORDER BY id
+                LIMIT %s
+                ''',
+                (last_id, batch_size)
+            )
+            events = cur.fetchall()
+            if not events:
+                return replayed
+
+            for event in events:
+                payload = event["payload"]
+                if isinstance(payload, str):
+                    payload = json.loads(payload)
+                if event["event_type"] == "push":
+                    record_push(conn, payload)
+                else:
+                    record_pull_request(conn, payload)
+                    # La fila del espejo puede mover el PR a otro día del dashboard
+                    refresh_pull_request_buckets(
+                        cur, payload.get("repository", {}).get("id"), [payload.get("pull_request", {}).get("number")]
+                    )
+                    conn.commit()
+                last_id = event["id"]
+                replayed += 1
+        logger.info("🔁 %d events replayed into the mirror...", replayed)
+
+async def sync_repository(repo_full_name: str, token: str, branch: str, since: str | None = None) -> dict:
+    """
+    Copia al espejo todos los PRs del repositorio y los commits de `branch` (desde `since`,
+    o todo el historial) leídos de GitHub, y registra la cobertura para que las lecturas
+    puedan servirse del espejo. El webhook debe estar configurado antes: lo que llegue
+    después lo mantiene al día.
+
+    No pisa lo que ya guardaron los webhooks, que traen más campos que los listados.
+    """
+    from services.github.client import github_get, github_get_all
+
+    response = await github_get(f"/repos/{repo_full_name}", token)
+    if response.status_code != 200:
+        raise Exception(f"❌ Error fetching repository {repo_full_name}: {response.status_code}")
+    github_repo_id = response.json()["id"]
+
+    prs = await github_get_all(
+        f"/repos/{repo_full_name}/pulls", token, params={"state": "all"}, error_detail="Error fetching PRs"
+    )
+    commit_params = {"sha": branch}
+    if since:
+        commit_params["since"] = since
+    commits = await github_get_all(
+        f"/repos/{repo_full_name}/commits", token, params=commit_params, error_detail="Error fetching commits"
+    )
+
+    now = datetime.utcnow()
+    async with get_db_async() as conn:
+        cur = conn.cursor()
+        execute_values(
+            cur,
+            '''
+            INSERT INTO "Github_PullRequest"
+                (github_repo_id, pr_number, repo_full_name, title, state, author_login, requested_reviewers,
+                 head_ref, base_ref, head_sha, created_at, closed_at, merged_at, updated_at)
+            VALUES %s
+            ON CONFLICT (github_repo_id, pr_number) DO NOTHING
+            ''',
+            [
+                (
+                    github_repo_id,
+                    pr["number"],
+                    repo_full_name,
+                    pr.get("title"),
+                    pr.get("state"),
+                    (pr.get("user") or {}).get("login"),
+                    [r["login"] for r in pr.get("requested_reviewers") or []],
+                    (pr.get("head") or {}).get("ref"),
+                    (pr.get("base") or {}).get("ref"),
+                    (pr.get("head") or {}).get("sha"),
+                    parse_github_time(pr.get("created_at")),
+                    parse_github_time(pr.get("closed_at")),
+                    parse_github_time(pr.get("merged_at")),
+                    parse_github_time(pr.get("updated_at")) or now
+                )
+                for pr in prs
+            ]
+        )
+        execute_values(
+            cur,
+            '''
+            INSERT INTO "Github_Commit"
+                (github_repo_id, repo_full_name, branch, sha, message, author_login, author_name,
+                 committed_at, verified, updated_at)
+            VALUES %s
+            ON CONFLICT (github_repo_id, branch, sha) DO UPDATE
+            SET author_login = COALESCE("Github_Commit".author_login, EXCLUDED.author_login),
+                verified = EXCLUDED.verified
+            ''',
+            [
+                (
+                    github_repo_id,
+                    repo_full_name,
+                    branch,
+                    commit["sha"],
+                    commit["commit"].get("message"),
+                    (commit.get("author") or {}).get("login"),
+                    (commit["commit"].get("author") or {}).get("name"),
+                    parse_github_time((commit["commit"].get("author") or {}).get("date")),
+                    (commit["commit"].get("verification") or {}).get("verified", False),
+                    now
+                )
+                for commit in commits
+            ]
+        )
+        execute_values(
+            cur,
+            '''
+            INSERT INTO "Github_Mirror_Coverage" (repo_full_name, kind, branch, complete_since, synced_at)
+            VALUES %s
+            ON CONFLICT (repo_full_name, kind, branch) DO UPDATE
+            SET complete_since = EXCLUDED.complete_since,
+                synced_at = EXCLUDED.synced_at
+            ''',
+            [
+                (repo_full_name, "pull_requests", "", None, now),
+                (repo_full_name, "commits", branch, parse_github_time(since), now)
+            ]
+        )
+        # Los PRs que ahora tienen fecha de GitHub pueden cambiar de día en el dashboard
+        refresh_pull_request_buckets(cur, github_repo_id, [pr["number"] for pr in prs])
+        conn.commit()
+
+    return {"pull_requests": len(prs), "commits": len(commits)}
+
+if __name__ == "__main__":
+    # python -m services.github.mirror backfill
+    # GITHUB_TOKEN=... python -m services.github.mirror sync owner/repo main [2025-01-01T00:00:00Z]
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        print(f"✅ Mirror backfill finished: {backfill_mirror()} events replayed.")
+    elif len(sys.argv) > 3 and sys.argv[1] == "sync" and os.getenv("GITHUB_TOKEN"):
+        import asyncio
+        since = sys.argv[4] if len(sys.argv) > 4 else None
+        counts = asyncio.run(sync_repository(sys.argv[2], os.getenv("GITHUB_TOKEN"), sys.argv[3], since))
+        print(f"✅ Mirror synced: {counts['pull_requests']} pull requests, {counts['commits']} commits.")
+    else:
+        print("Usage: python -m services.github.mirror backfill")
+        print("       GITHUB_TOKEN=... python -m services.github.mirror sync owner/repo branch [since]")
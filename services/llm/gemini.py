@@ -1,33 +1,226 @@
-import requests
+import asyncio
+import os
+import random
+import time
+import httpx
+import config  # noqa: F401  (carga .env)
+from utils.log import get_logger
+from utils.metrics import track_upstream
 
-def call_llm(prompt: str, api_key: str) -> str:
+logger = get_logger(__name__)
+
+# Se puede apuntar a un servidor Gemini falso local para pruebas (p. ej. http://127.0.0.1:8081)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "5"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+GEMINI_RETRY_BASE_DELAY = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "1"))
+GEMINI_RETRY_MAX_DELAY = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "30"))
+# Límite por API key (token bucket): peticiones por minuto y ráfaga máxima
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "5"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def load_api_keys() -> list[str]:
     """
-    Llama al modelo Gemini con el prompt dado y la API key especificada.
+    Lee las keys de GEMINI_API_KEYS (separadas por comas) y de GEMINI_API_KEY_1, GEMINI_API_KEY_2, ...
+    """
+    keys = [key.strip() for key in os.getenv("GEMINI_API_KEYS", "").split(",") if key.strip()]
+
+    index = 1
+    while os.getenv(f"GEMINI_API_KEY_{index}"):
+        keys.append(os.getenv(f"GEMINI_API_KEY_{index}").strip())
+        index += 1
+
+    return list(dict.fromkeys(keys))
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        if time.monotonic() < self.blocked_until:
+            return 0.0
+        self._refill()
+        return self.tokens
+
+    def try_acquire(self) -> bool:
+        if self.available() >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def cool_down(self, seconds: float):
+        """Tras un 429 la key no se vuelve a usar hasta que pase `seconds`."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+class GeminiClient:
+    """
+    Cliente async de Gemini con conexión compartida, timeouts por llamada, reintentos con
+    backoff y jitter ante 429/5xx, y reparto de peticiones entre varias API keys según la
+    cuota que le queda a cada una.
+    """
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        base_url: str = GEMINI_BASE_URL,
+        model: str = GEMINI_MODEL,
+        timeout: float = GEMINI_TIMEOUT,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE,
+        burst: int = GEMINI_BURST,
+        transport: httpx.AsyncBaseTransport | None = None
+    ):
+        if not api_keys:
+            raise Exception("❌ No Gemini API keys configured (GEMINI_API_KEYS or GEMINI_API_KEY_<n>)")
+
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.buckets = {key: TokenBucket(requests_per_minute / 60, burst) for key in api_keys}
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=GEMINI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=GEMINI_MAX_CONNECTIONS),
+            transport=transport
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _bucket_for(self, api_key: str) -> TokenBucket:
+        if api_key not in self.buckets:
+            first = next(iter(self.buckets.values()))
+            self.buckets[api_key] = TokenBucket(first.rate, first.capacity)
+        return self.buckets[api_key]
+
+    async def _acquire_key(self, api_key: str | None = None) -> str:
+        while True:
+            if api_key is not None:
+                candidates = [(api_key, self._bucket_for(api_key))]
+            else:
+                # La key con más cuota disponible primero; los empates se reparten al azar
+                candidates = sorted(
+                    self.buckets.items(),
+                    key=lambda item: (item[1].available(), random.random()),
+                    reverse=True
+                )
+
+            for key, bucket in candidates:
+                if bucket.try_acquire():
+                    return key
+
+            await asyncio.sleep(min(bucket.wait_time() for _, bucket in candidates))
+
+    def _retry_delay(self, attempt: int, retry_after: str | None = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), GEMINI_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+        return random.uniform(0, min(GEMINI_RETRY_BASE_DELAY * (2 ** attempt), GEMINI_RETRY_MAX_DELAY))
+
+    async def generate(self, prompt: str, api_key: str | None = None, timeout: float | None = None) -> str:
+        body = {
+            "contents": [
+                {
+                    "parts": [
+                        {"text": prompt}
+                    ]
+                }
+            ]
+        }
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            key = await self._acquire_key(api_key)
+            retry_after = None
+            try:
+                with track_upstream("gemini", "generateContent") as outcome:
+                    response = await self._client.post(
+                        f"/v1beta/models/{self.model}:generateContent",
+                        # En cabecera y no en la URL: la URL acaba en los mensajes de error y en los logs
+                        headers={"x-goog-api-key": key},
+                        json=body,
+                        timeout=timeout or self.timeout
+                    )
+                    outcome["status"] = response.status_code
+            except httpx.TransportError as e:
+                last_error = e
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    data = response.json()
+                    return data["candidates"][0]["content"]["parts"][0]["text"]
+
+                retry_after = response.headers.get("retry-after")
+                last_error = httpx.HTTPStatusError(
+                    f"Gemini returned {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+                if response.status_code == 429:
+                    self._bucket_for(key).cool_down(self._retry_delay(attempt, retry_after) or GEMINI_RETRY_BASE_DELAY)
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+
+        raise last_error
+
+_client = None
+
+def open_llm_client() -> GeminiClient:
+    global _client
+
+    if _client is None:
+        _client = GeminiClient(load_api_keys())
+    return _client
+
+async def close_llm_client():
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_llm_client() -> GeminiClient:
+    return open_llm_client()
+
+async def call_llm(prompt: str, api_key: str | None = None, timeout: float | None = None) -> str:
+    """
+    Llama al modelo Gemini con el prompt dado.
 
     Args:
         prompt (str): Texto de entrada para el modelo.
-        api_key (str): API key de Google Gemini.
+        api_key (str | None): API key concreta a usar; por defecto se elige la key con más cuota disponible.
+        timeout (float | None): Timeout de esta llamada en segundos (por defecto GEMINI_TIMEOUT).
 
     Returns:
         str: Texto generado por Gemini o mensaje de error.
     """
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-    body = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": prompt}
-                ]
-            }
-        ]
-    }
-
     try:
-        response = requests.post(url, json=body, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data["candidates"][0]["content"]["parts"][0]["text"]
+        return await get_llm_client().generate(prompt, api_key=api_key, timeout=timeout)
     except Exception as e:
-        print("❌ Error calling Gemini:", e)
+        logger.error("❌ Error calling Gemini: %s", e)
         return "Error generating content."
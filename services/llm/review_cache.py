@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+import config  # noqa: F401  (carga .env)
+from database import get_db
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Cambiar esta versión cuando cambie el prompt de revisión por archivo: invalida todas las entradas anteriores
+REVIEW_PROMPT_VERSION = os.getenv("REVIEW_PROMPT_VERSION", "1")
+REVIEW_CACHE_TTL_DAYS = int(os.getenv("REVIEW_CACHE_TTL_DAYS", "30"))
+REVIEW_CACHE_MAX_ENTRIES = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", "50000"))
+REVIEW_CACHE_PRUNE_EVERY = int(os.getenv("REVIEW_CACHE_PRUNE_EVERY", "500"))
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "errors": 0
+}
+
+def review_cache_key(structured_lines: list) -> str:
+    """
+    Hash del diff normalizado (número de línea, tipo y código ya sin espacios) más la versión del prompt.
+    """
+    digest = hashlib.sha256(REVIEW_PROMPT_VERSION.encode())
+    for l in structured_lines:
+        digest.update(f"{l.line}\x1f{l.type}\x1f{l.code}\x1e".encode())
+    return digest.hexdigest()
+
+def get_cached_review(cache_key: str) -> list | None:
+    try:
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                '''
+                UPDATE "Review_Cache"
+                SET hits = hits + 1, last_hit_at = %s
+                WHERE cache_key = %s AND prompt_version = %s AND created_at >= %s
+                RETURNING comments
+                ''',
+                (
+                    datetime.utcnow(),
+                    cache_key,
+                    REVIEW_PROMPT_VERSION,
+                    datetime.utcnow() - timedelta(days=REVIEW_CACHE_TTL_DAYS)
+                )
+            )
+            row = cur.fetchone()
+            conn.commit()
+    except Exception as e:
+        logger.error("❌ Error reading Review_Cache: %s", e)
+        _stats["errors"] += 1
+        return None
+
+    if row is None:
+        _stats["misses"] += 1
+        return None
+
+    _stats["hits"] += 1
+    comments = row["comments"]
+    return json.loads(comments) if isinstance(comments, str) else comments
+
+def store_review(cache_key: str, comments: list):
+    try:
+        with get_db() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                '''
+                INSERT INTO "Review_Cache" (cache_key, prompt_version, comments, created_at)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (cache_key) DO UPDATE
+                SET prompt_version = EXCLUDED.prompt_version,
+                    comments = EXCLUDED.comments,
+                    created_at = EXCLUDED.created_at
+                ''',
+                (cache_key, REVIEW_PROMPT_VERSION, json.dumps(comments), datetime.utcnow())
+            )
+            conn.commit()
+    except Exception as e:
+        logger.error("❌ Error writing Review_Cache: %s", e)
+        _stats["errors"] += 1
+        return
+
+    _stats["stores"] += 1
+    if _stats["stores"] % REVIEW_CACHE_PRUNE_EVERY == 0:
+        prune_review_cache()
+
+def prune_review_cache() -> int:
+    """
+    Borra entradas caducadas, de otras versiones del prompt y las menos usadas por encima de REVIEW_CACHE_MAX_ENTRIES.
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            'DELETE FROM "Review_Cache" WHERE prompt_version <> %s OR created_at < %s',
+            (REVIEW_PROMPT_VERSION, datetime.utcnow() - timedelta(days=REVIEW_CACHE_TTL_DAYS))
+        )
+        deleted = cur.rowcount
+        cur.execute(
+            '''
+            DELETE FROM "Review_Cache"
+            WHERE cache_key IN (
+                SELECT cache_key FROM "Review_Cache"
+                ORDER BY COALESCE(last_hit_at, created_at) DESC
+                OFFSET %s
+            )
+            ''',
+            (REVIEW_CACHE_MAX_ENTRIES,)
+        )
+        deleted += cur.rowcount
+        conn.commit()
+    return deleted
+
+def clear_review_cache() -> int:
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute('DELETE FROM "Review_Cache"')
+        deleted = cur.rowcount
+        conn.commit()
+    return deleted
+
+def get_review_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else None,
+        "prompt_version": REVIEW_PROMPT_VERSION
+    }
+
+if __name__ == "__main__":
+    # python -m services.llm.review_cache [prune|clear]
+    command = sys.argv[1] if len(sys.argv) > 1 else "prune"
+    if command == "clear":
+        print(f"🧹 {clear_review_cache()} cached reviews deleted.")
+    else:
+        print(f"🧹 {prune_review_cache()} cached reviews pruned.")
@@ -1,9 +1,7 @@
 from fastapi import Header, HTTPException
 from jose import jwt, JWTError
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import config  # noqa: F401  (carga .env)
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
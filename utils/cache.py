@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Cache LRU en memoria, acotado por número de entradas y (opcionalmente) por tamaño total y TTL.
+
+    `size` en `set()` es el peso de cada entrada (p. ej. bytes del cuerpo); cuando la suma
+    supera `max_size` se desalojan las entradas menos usadas. Con `ttl` (segundos) las
+    entradas caducan y `get()` deja de devolverlas.
+    """
+
+    def __init__(self, max_entries: int, max_size: int | None = None, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, size, expires_at = item
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                self.size -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, size: int = 1):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+
+            if self.max_size is not None and size > self.max_size:
+                return
+
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._data[key] = (value, size, expires_at)
+            self.size += size
+
+            while len(self._data) > self.max_entries or (
+                self.max_size is not None and self.size > self.max_size
+            ):
+                _, (_, evicted_size, _) = self._data.popitem(last=False)
+                self.size -= evicted_size
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return None
+            self.size -= item[1]
+            return item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._data)
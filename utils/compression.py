@@ -0,0 +1,114 @@
+import gzip
+import os
+import config  # noqa: F401  (carga .env)
+
+# brotli es opcional (pip install brotli): sin él solo se ofrece gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Respuestas más pequeñas que esto (bytes) se envían sin comprimir
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+def parse_accept_encoding(value: str) -> set[str]:
+    """
+    Codificaciones aceptadas por el cliente (las de q=0 se descartan).
+    """
+    accepted = set()
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime con brotli o gzip, según `Accept-Encoding`, las
+    respuestas JSON/texto de al menos `minimum_size` bytes. Las respuestas en
+    streaming (varios trozos de cuerpo) se envían tal cual.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers = dict(start_message.get("headers") or [])
+            content_type = response_headers.get(b"content-type", b"").decode("latin-1")
+
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in response_headers
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            new_headers = [
+                (name, value) for name, value in start_message.get("headers") or []
+                if name not in (b"content-length", b"vary")
+            ]
+            vary = response_headers.get(b"vary")
+            new_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding")
+            ]
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
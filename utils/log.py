@@ -0,0 +1,102 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import config  # noqa: F401  (carga .env)
+
+# DEBUG, INFO, WARNING, ERROR. En producción INFO: los logger.debug(...) no formatean nada
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (legible) o "json" (una línea JSON por registro)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Fracción de las líneas por elemento (por commit, por archivo...) que se escriben
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+# Atributos que tiene cualquier LogRecord; el resto vienen de `extra=` y van como campos
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+def setup_logging():
+    """
+    Configura el logger "app": los registros se encolan en el hilo que los emite y un
+    QueueListener los escribe en stdout desde su propio hilo, así el event loop y los
+    workers nunca esperan a la E/S de la consola.
+    """
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(
+            JsonFormatter() if LOG_FORMAT == "json"
+            else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        root = logging.getLogger("app")
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(_queue_handler)
+        root.propagate = False
+
+def stop_logging():
+    """
+    Vacía la cola, para el hilo de escritura y quita el handler (al apagar la app). Un
+    setup_logging posterior vuelve a dejar exactamente un handler.
+    """
+    global _listener, _queue_handler
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        logging.getLogger("app").removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+        _queue_handler = None
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger del módulo, p. ej. get_logger(__name__). Usar formato perezoso:
+    logger.info("Commit %s analizado", sha), nunca f-strings.
+    """
+    setup_logging()
+    return logging.getLogger(f"app.{name}")
+
+def log_sampled(logger: logging.Logger, level: int, msg: str, *args, rate: float | None = None, **kwargs):
+    """
+    Para líneas que se repiten por cada elemento: solo se escribe una fracción `rate`
+    (LOG_SAMPLE_RATE por defecto). Con el nivel desactivado no cuesta más que la comprobación.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if random.random() >= (LOG_SAMPLE_RATE if rate is None else rate):
+        return
+    logger.log(level, msg, *args, **kwargs)
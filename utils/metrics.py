@@ -0,0 +1,229 @@
+import threading
+import time
+from contextlib import contextmanager
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class _Metric:
+    """
+    Métrica con etiquetas, en el formato de texto de Prometheus.
+
+    Cada combinación de valores de `labelnames` es una serie distinta: las etiquetas
+    deben tener pocos valores posibles (rutas plantilla, no URLs completas).
+    """
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple, extra: dict | None = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in items]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """
+        Calcula el valor al exportar: `function()` devuelve {tupla de valores de etiquetas: valor}.
+        """
+        self._function = function
+
+    def _samples(self) -> list[str]:
+        if self._function is not None:
+            try:
+                values = self._function()
+            except Exception as e:
+                logger.warning("⚠️ Could not collect metric %s: %s", self.name, e)
+                return []
+            with self._lock:
+                self._values = {tuple(str(v) for v in key): value for key, value in values.items()}
+        return super()._samples()
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [conteo por bucket..., suma, total]
+            series = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+
+        lines = []
+        for key, series in items:
+            *counts, total, count = series
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': str(bound)})} {bucket_count}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+REGISTRY: list[_Metric] = []
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+# Métricas del servicio
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Peticiones HTTP atendidas.", ("method", "endpoint", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP.", ("method", "endpoint")
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso."
+)
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Llamadas a GitHub, Gemini y Postgres.", ("upstream", "operation", "status")
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Latencia de las llamadas a GitHub, Gemini y Postgres.", ("upstream", "operation")
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "upstream_requests_in_flight", "Llamadas a GitHub, Gemini y Postgres en curso.", ("upstream",)
+)
+WEBHOOK_EVENTS = Counter(
+    "webhook_events_total", "Eventos de webhook procesados por los workers.", ("event_type", "outcome")
+)
+WEBHOOK_EVENT_DURATION = Histogram(
+    "webhook_event_duration_seconds", "Tiempo de procesamiento de un evento de webhook.", ("event_type",),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+WEBHOOK_QUEUE_DEPTH = Gauge(
+    "webhook_queue_depth", "Eventos en Github_Event por estado.", ("status",)
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Conexiones del pool de Postgres por estado.", ("state",)
+)
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Mide una llamada externa. El bloque puede poner `outcome["status"]` (p. ej. el código
+    HTTP); si lanza una excepción queda como "error".
+    """
+    outcome = {"status": "ok"}
+    UPSTREAM_IN_FLIGHT.inc(upstream=upstream)
+    started = time.perf_counter()
+    try:
+        yield outcome
+    except BaseException:
+        outcome["status"] = "error"
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(upstream=upstream)
+        UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream=upstream, operation=operation)
+        UPSTREAM_REQUESTS.inc(upstream=upstream, operation=operation, status=outcome["status"])
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: cuenta y mide cada petición por ruta plantilla (`/github/commits`,
+    no la URL con parámetros) para que las series no crezcan sin límite.
+
+    Es ASGI puro a propósito: un middleware de `app.middleware("http")` reenvía cada
+    respuesta en trozos (`more_body=True`) y CompressionMiddleware ya no podría comprimirla.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # El router de FastAPI deja la ruta resuelta en el mismo scope
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=method, endpoint=endpoint)
+            HTTP_REQUESTS.inc(method=method, endpoint=endpoint, status=status)
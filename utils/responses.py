@@ -0,0 +1,39 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from starlette.responses import JSONResponse
+
+# orjson es opcional (pip install orjson): sin él se usa json de la librería estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content) -> bytes:
+    """
+    Serializa a JSON compacto en UTF-8; datetime/date salen en ISO 8601.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse que serializa con orjson (o json como alternativa) y entiende
+    datetime/Decimal sin pasar antes por `jsonable_encoder`.
+
+    Devolverla directamente desde la ruta (`return FastJSONResponse(data)`) evita
+    también el recorrido de `jsonable_encoder` que FastAPI hace sobre los dict.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)